@@ -0,0 +1,366 @@
+"""
+벤치마크용 로컬 대역(fake) 모음
+- FakeClient/FakeWorksheet: gspread 클라이언트/워크시트 흉내 (메모리 내 시트)
+- FakeSMTP: smtplib.SMTP 흉내
+- FakeTelegramServer: Telegram Bot API(sendMessage/sendDocument)를 흉내 내는 로컬 HTTP 서버
+모든 대역은 호출 수를 CallCounter에 기록하고, 호출마다 지정한 지연(latency)을 줍니다.
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter
+from email.policy import default as email_policy
+from email.parser import BytesParser
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+class CallCounter:
+    """스레드 안전한 API 호출 카운터"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def hit(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+calls = CallCounter()
+
+# ---------------------------------------------------------------- Sheets
+
+USER_COLUMNS = ["이름", "이메일", "만료일", "전화번호", "비고", "그룹", "그룹 번호", "결제 여부", "지인 여부"]
+EXTENDS_COLUMNS = USER_COLUMNS + ["연장 개월수", "입금 여부", "기록 시간"]
+
+def make_user_rows(n, seed=0, today=None):
+    """만료일이 오늘 기준 -30~+60일에 퍼진 합성 사용자 n명"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    rows = []
+    for i in range(n):
+        free = rng.random() < 0.05
+        exp = "" if free else (today + timedelta(days=rng.randint(-30, 60))).strftime("%Y-%m-%d")
+        rows.append([
+            f"사용자{i}",
+            f"user{i}@example.com",
+            exp,
+            f"010{rng.randint(0, 99999999):08d}",
+            "지인" if rng.random() < 0.1 else "",
+            # 관리자 한 명이 그룹 4개, 그룹마다 5명
+            f"admin{i // 20}@example.com",
+            i // 5 % 4 + 1,
+            "X" if free or rng.random() < 0.05 else "O",
+            "O" if free else "",
+        ])
+    return rows
+
+def make_extends_rows(user_rows, ratio=0.05, seed=1, now=None):
+    """사용자 일부에 대한 extends_data 행 (입금 O/미입금/기한 경과 섞어서)"""
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    rows = []
+    for u in user_rows:
+        if not u[2] or rng.random() >= ratio:
+            continue
+        recorded = now - timedelta(days=rng.randint(0, 3), hours=rng.randint(0, 12))
+        rows.append(u + [
+            rng.choice(["", "1", "3개월", "6개월"]),
+            rng.choice(["", "O", "X"]),
+            recorded.strftime("%Y-%m-%d %H:%M:%S"),
+        ])
+    return rows
+
+# 시트 격자에서 값이 있는 행 아래로 남아 있는 빈 행 수
+SPARE_ROWS = 100
+
+class FakeSpreadsheet:
+    def __init__(self, client, key, sheets):
+        self.client = client
+        self.id = key
+        self._worksheets = {
+            name: FakeWorksheet(self, name, header, rows, sheet_id)
+            for sheet_id, (name, (header, rows)) in enumerate(sheets.items())
+        }
+
+    def worksheet(self, name):
+        self.client.sleep("open_worksheet")
+        return self._worksheets[name]
+
+    def worksheets(self):
+        return list(self._worksheets.values())
+
+    def fetch_sheet_metadata(self, params=None):
+        """시트 속성 (격자 행 수는 실제 시트처럼 값이 있는 행보다 SPARE_ROWS만큼 크게)"""
+        self.client.sleep("spreadsheet.fetch_sheet_metadata")
+        return {"sheets": [
+            {"properties": {"sheetId": ws.id, "title": ws.title,
+                            "gridProperties": {"rowCount": len(ws.values) + SPARE_ROWS}}}
+            for ws in self._worksheets.values()
+        ]}
+
+    def batch_update(self, body):
+        self.client.sleep("spreadsheet.batch_update")
+        by_id = {ws.id: ws for ws in self._worksheets.values()}
+        for req in body.get("requests", []):
+            rng = req["deleteDimension"]["range"]
+            ws = by_id[rng["sheetId"]]
+            # startIndex/endIndex는 헤더 포함 0부터 시작하는 행 번호
+            del ws.values[rng["startIndex"]:rng["endIndex"]]
+        return {}
+
+class FakeWorksheet:
+    """values[0]이 헤더인 2차원 리스트로 시트를 흉내"""
+
+    def __init__(self, spreadsheet, title, header, rows, sheet_id):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.values = [list(header)] + [list(r) for r in rows]
+
+    def _sleep(self, name):
+        self.spreadsheet.client.sleep(f"worksheet.{name}")
+
+    def _transfer(self, rows):
+        """응답에 실린 셀 수 (전송량 비교용)"""
+        calls.hit("sheets.cells", sum(len(r) for r in rows))
+        return rows
+
+    def get_all_records(self, *args, **kwargs):
+        self._sleep("get_all_records")
+        self._transfer(self.values)
+        header = self.values[0]
+        return [dict(zip(header, row + [""] * (len(header) - len(row)))) for row in self.values[1:]]
+
+    def get_all_values(self, *args, **kwargs):
+        self._sleep("get_all_values")
+        return self._transfer([list(r) for r in self.values])
+
+    def batch_get(self, ranges, *args, **kwargs):
+        """A1 범위별 값 (실제 API처럼 문자열로, 뒤쪽 빈 칸/빈 행은 잘라서)"""
+        self._sleep("batch_get")
+        from gspread.utils import a1_range_to_grid_range
+        result = []
+        for a1 in ranges:
+            grid = a1_range_to_grid_range(a1)
+            rows = []
+            for row in self.values[grid["startRowIndex"]:grid["endRowIndex"]]:
+                cells = ["" if v is None else str(v) for v in row[grid["startColumnIndex"]:grid["endColumnIndex"]]]
+                while cells and cells[-1] == "":
+                    cells.pop()
+                rows.append(cells)
+            while rows and not rows[-1]:
+                rows.pop()
+            result.append(self._transfer(rows))
+        return result
+
+    def get(self, range_name=None, *args, **kwargs):
+        self._sleep("get")
+        return [list(r) for r in self.values]
+
+    def row_values(self, row, *args, **kwargs):
+        self._sleep("row_values")
+        return self._transfer([list(self.values[row - 1]) if row <= len(self.values) else []])[0]
+
+    def append_row(self, row, *args, **kwargs):
+        self._sleep("append_row")
+        self.values.append(list(row))
+
+    def append_rows(self, rows, *args, **kwargs):
+        self._sleep("append_rows")
+        self.values.extend(list(r) for r in rows)
+
+    def clear(self):
+        self._sleep("clear")
+        self.values = []
+
+    def update(self, values, *args, **kwargs):
+        self._sleep("update")
+        self.values = [list(r) for r in values]
+
+    def batch_update(self, data, *args, **kwargs):
+        self._sleep("batch_update")
+        from gspread.utils import a1_to_rowcol
+        for item in data:
+            row, col = a1_to_rowcol(item["range"].split(":")[0])
+            for dr, line in enumerate(item["values"]):
+                for dc, value in enumerate(line):
+                    r, c = row - 1 + dr, col - 1 + dc
+                    while len(self.values) <= r:
+                        self.values.append([])
+                    while len(self.values[r]) <= c:
+                        self.values[r].append("")
+                    self.values[r][c] = value
+
+class FakeClient:
+    """gspread.Client 대역. open_by_key로 FakeSpreadsheet를 돌려줌"""
+
+    def __init__(self, spreadsheets, latency=0.0):
+        self.latency = latency
+        self._spreadsheets = {
+            key: FakeSpreadsheet(self, key, sheets) for key, sheets in spreadsheets.items()
+        }
+
+    def sleep(self, name):
+        calls.hit(f"sheets.{name}")
+        if self.latency:
+            time.sleep(self.latency)
+
+    def open_by_key(self, key):
+        self.sleep("open_by_key")
+        return self._spreadsheets[key]
+
+# ---------------------------------------------------------------- SMTP
+
+class FakeSMTP:
+    """smtplib.SMTP 대역. 연결/로그인/발송 각각에 latency만큼 지연"""
+
+    latency = 0.0
+
+    def __init__(self, host="", port=0, *args, **kwargs):
+        calls.hit("smtp.connect")
+        time.sleep(self.latency)
+
+    def starttls(self, *args, **kwargs):
+        calls.hit("smtp.starttls")
+        time.sleep(self.latency)
+
+    def login(self, user, password):
+        calls.hit("smtp.login")
+        time.sleep(self.latency)
+
+    def sendmail(self, from_addr, to_addrs, msg, *args, **kwargs):
+        calls.hit("smtp.sendmail")
+        time.sleep(self.latency)
+        return {}
+
+    def send_message(self, msg, *args, **kwargs):
+        return self.sendmail(None, None, msg)
+
+    def noop(self):
+        return (250, b"OK")
+
+    def quit(self):
+        calls.hit("smtp.quit")
+
+    def close(self):
+        pass
+
+# ---------------------------------------------------------------- Telegram
+
+def _parse_body(headers, body):
+    """Bot API 요청 본문(JSON, form 또는 multipart)을 dict로 (파일 필드는 (파일 이름, 바이트))"""
+    content_type = headers.get("Content-Type", "")
+    try:
+        if "json" in content_type:
+            return json.loads(body or b"{}")
+        if "x-www-form-urlencoded" in content_type:
+            return {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        if "multipart/form-data" in content_type:
+            message = BytesParser(policy=email_policy).parsebytes(
+                f"Content-Type: {content_type}\r\n\r\n".encode() + body
+            )
+            fields = {}
+            for part in message.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                payload = part.get_payload(decode=True)
+                filename = part.get_filename()
+                fields[name] = (filename, payload) if filename else payload.decode()
+            return fields
+    except ValueError:
+        pass
+    return {}
+
+class FakeTelegramServer:
+    """
+    Telegram Bot API 대역 HTTP 서버.
+    /bot<token>/<method> 로 오는 요청을 모두 200 OK로 응답하고 메서드별 호출 수를 셉니다.
+    getMe/setWebhook/sendMessage는 python-telegram-bot이 해석할 수 있는 모양으로 응답하고,
+    sendMessage는 (chat_id, text)를 sent에, sendDocument는 (chat_id, 파일 이름, caption, 내용)을 documents에 남깁니다.
+    """
+
+    def __init__(self, latency=0.0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.messages = []
+        self.sent = []
+        self.documents = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                method = self.path.rsplit("/", 1)[-1]
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                calls.hit(f"telegram.{method}")
+                server.messages.append((method, len(body)))
+                if server.latency:
+                    time.sleep(server.latency)
+                result = server.result(method, _parse_body(self.headers, body))
+                payload = json.dumps({"ok": True, "result": result}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def result(self, method, data):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        if method in ("setWebhook", "deleteWebhook"):
+            return True
+        chat_id = int(data.get("chat_id", 1))
+        if method == "sendMessage":
+            self.sent.append((chat_id, data.get("text", "")))
+        elif method == "sendDocument":
+            filename, content = data.get("document", ("", b""))
+            self.documents.append((chat_id, filename, data.get("caption", ""), content))
+        return {
+            "message_id": len(self.messages),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": data.get("text", ""),
+        }
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        return False
+
+class FakeMessage:
+    """봇 핸들러에 넘길 update.message 대역 (reply_text 호출만 기록)"""
+
+    def __init__(self, text, chat_id=1):
+        self.text = text
+        self.chat_id = chat_id
+        self.replies = []
+
+    async def reply_text(self, text, *args, **kwargs):
+        calls.hit("telegram.reply_text")
+        self.replies.append(text)
+
+    async def reply_document(self, document, *args, **kwargs):
+        calls.hit("telegram.reply_document")
+        self.replies.append(document)
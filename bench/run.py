@@ -0,0 +1,227 @@
+"""
+오프라인 성능 측정 스크립트
+
+구글 시트/SMTP/텔레그램을 모두 로컬 대역(bench/fakes.py)으로 바꿔 끼운 뒤
+daily_check 단계별 함수와 봇 명령어의 실행 시간, API 호출 수, 최대 메모리를 측정합니다.
+
+사용 예)
+    python -m bench.run                               # 100, 1000, 10000명
+    python -m bench.run --sizes 100 100000 --sheet-latency 200 --smtp-latency 50
+    python -m bench.run --only record_expiring_users --json bench_output.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPREADSHEET_ID = "bench-spreadsheet"
+
+# 봇/헬퍼 모듈이 import 시점에 읽는 환경변수를 대역 값으로 채움
+os.environ.setdefault("TELEGRAM_TOKEN", "bench-token")
+os.environ.setdefault("ADMIN_CHAT_ID", "1")
+os.environ.setdefault("GOOGLE_JSON_KEY", "{}")
+os.environ.setdefault("EMAIL_ADDRESS", "bench@example.com")
+os.environ.setdefault("EMAIL_PASSWORD", "bench")
+os.environ["SPREADSHEET_ID"] = SPREADSHEET_ID
+# 실제 Gmail 한도용 발송 속도 제한은 측정에서 제외 (필요하면 환경변수로 지정)
+os.environ.setdefault("EMAIL_RATE_PER_SEC", "0")
+os.environ.setdefault("TELEGRAM_RATE_PER_SEC", "0")
+
+sys.path.insert(0, ROOT)
+
+from bench import fakes  # noqa: E402
+
+# 봇 명령어가 실제로 쓰는 열 (열 선택 조회 비교용)
+BOT_COLUMNS = ["이름", "이메일", "만료일", "그룹", "그룹 번호"]
+DAILY_STAGES = ["record_expiring_users", "check_payment_and_extend", "handle_phone_list_for_sms"]
+BOT_COMMANDS = {
+    "cmd .도움말": ("help_command", ".도움말", None),
+    "cmd .만료 3": ("expired_command", ".만료 3", r"^\.만료\s*(-?\d+)$"),
+    "cmd .만료 -3": ("expired_command", ".만료 -3", r"^\.만료\s*(-?\d+)$"),
+    "cmd .만료 30": ("expired_command", ".만료 30", r"^\.만료\s*(-?\d+)$"),
+    "cmd .오늘만료": ("today_expired_command", ".오늘만료", None),
+    "cmd .무료 사용자": ("free_users_command", ".무료 사용자", None),
+    "cmd .빈자리": ("vacancy_command", ".빈자리", r"^\.빈자리\s*(\d+)?$"),
+    "cmd .내보내기 전체": (
+        "export_command", ".내보내기 전체",
+        r"^\.내보내기(?:\s+(전체|만료\s*-?\d+|오늘만료|번호))?(?:\s+(?i:(csv|xlsx)))?$"
+    ),
+    "cmd .새로고침": ("refresh_command", ".새로고침", None),
+}
+
+def install_fakes(n_users, sheet_latency, smtp_latency, spreadsheet_ids=(SPREADSHEET_ID,)):
+    """시트/SMTP 대역을 설치하고 캐시를 초기화 (spreadsheet_ids마다 같은 크기의 시트 한 벌)"""
+    import smtplib
+    from utils import journal, replica, sheet_helper, user_cache
+
+    spreadsheets = {}
+    for seed, spreadsheet_id in enumerate(spreadsheet_ids):
+        users = fakes.make_user_rows(n_users, seed=seed)
+        extends = fakes.make_extends_rows(users)
+        spreadsheets[spreadsheet_id] = {
+            "user_data": (fakes.USER_COLUMNS, users),
+            "extends_data": (fakes.EXTENDS_COLUMNS, extends),
+        }
+    client = fakes.FakeClient(spreadsheets, latency=sheet_latency)
+
+    sheet_helper.reset_google_client()
+    sheet_helper.get_google_client = lambda: client
+
+    fakes.FakeSMTP.latency = smtp_latency
+    smtplib.SMTP = fakes.FakeSMTP
+
+    user_cache._users = None
+    user_cache.invalidate_users()
+
+    # 측정마다 빈 저널/사본에서 시작 (이전 측정의 발송 기록을 재개로 오인하지 않도록)
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    journal.JOURNAL_PATH = os.path.join(workdir, "journal.sqlite3")
+    journal._journals.clear()
+    # 로컬 사본도 비운 상태에서 시작 (첫 조회가 동기화를 일으킴)
+    replica.REPLICA_PATH = os.path.join(workdir, "replica.sqlite3")
+    replica._replicas.clear()
+    return client
+
+def measure(name, fn, track_memory=True):
+    fakes.calls.reset()
+    if track_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    error = None
+    try:
+        fn()
+    except Exception as e:
+        error = repr(e)
+    wall = time.perf_counter() - started
+    peak = 0
+    if track_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "name": name,
+        "wall_s": round(wall, 4),
+        "peak_mb": round(peak / 1024 / 1024, 2),
+        "calls": fakes.calls.snapshot(),
+        "error": error,
+    }
+
+def run_daily_check():
+    from utils import payment_logic
+    from utils.telegram_helper import coalesce_messages
+
+    with coalesce_messages():
+        run = payment_logic.DailyRun()
+        for stage in DAILY_STAGES:
+            getattr(payment_logic, stage)(run)
+        run.commit()
+
+def bot_command_runner(bot, handler_name, text, pattern):
+    handler = getattr(bot, handler_name)
+
+    def run():
+        message = fakes.FakeMessage(text)
+        update = SimpleNamespace(
+            message=message,
+            effective_message=message,
+            effective_chat=SimpleNamespace(id=message.chat_id),
+            effective_user=SimpleNamespace(id=message.chat_id),
+        )
+        matches = [re.match(pattern, text)] if pattern else []
+        context = SimpleNamespace(matches=matches, args=[], bot=None)
+        asyncio.run(handler(update, context))
+
+    return run
+
+def run_size(n_users, args):
+    from utils import payment_logic
+    import bot
+
+    results = []
+    for stage in DAILY_STAGES:
+        if args.only and stage not in args.only:
+            continue
+        install_fakes(n_users, args.sheet_latency, args.smtp_latency)
+        results.append(measure(stage, getattr(payment_logic, stage), not args.no_memory))
+
+    # 세 단계를 하나의 DailyRun으로 이어서 실행 (daily_check와 같은 흐름)
+    if not args.only or "daily_check" in args.only:
+        install_fakes(n_users, args.sheet_latency, args.smtp_latency)
+        results.append(measure("daily_check", run_daily_check, not args.no_memory))
+
+    # 시트 전체 조회 vs 필요한 열만 페이지 단위 조회 (sheets.cells = 전송된 셀 수)
+    if not args.only or "fetch" in args.only:
+        from utils import sheet_helper
+        install_fakes(n_users, args.sheet_latency, args.smtp_latency)
+        results.append(measure("fetch all columns", lambda: sheet_helper.get_sheet_df("user_data"), not args.no_memory))
+        results.append(measure(
+            f"fetch {len(BOT_COLUMNS)} columns",
+            lambda: sheet_helper.fetch_sheet_columns("user_data", BOT_COLUMNS),
+            not args.no_memory
+        ))
+
+    # 봇 명령어는 같은 데이터에서 연속 실행 (첫 명령이 캐시를 채우고 이후는 캐시 적중)
+    install_fakes(n_users, args.sheet_latency, args.smtp_latency)
+    for name, (handler_name, text, pattern) in BOT_COMMANDS.items():
+        if args.only and name not in args.only and handler_name not in args.only:
+            continue
+        if not hasattr(bot, handler_name):
+            continue
+        results.append(measure(name, bot_command_runner(bot, handler_name, text, pattern), not args.no_memory))
+
+    for r in results:
+        r["users"] = n_users
+    return results
+
+def print_table(results):
+    print(f"{'users':>7}  {'benchmark':<28} {'wall(s)':>9} {'peak(MB)':>9}  calls")
+    for r in results:
+        calls = ", ".join(f"{k}={v}" for k, v in sorted(r["calls"].items()))
+        line = f"{r['users']:>7}  {r['name']:<28} {r['wall_s']:>9.3f} {r['peak_mb']:>9.2f}  {calls}"
+        if r["error"]:
+            line += f"  ERROR {r['error']}"
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="platflix-bot 오프라인 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="사용자 시트 행 수")
+    parser.add_argument("--sheet-latency", type=float, default=0, help="시트 API 호출당 지연(ms)")
+    parser.add_argument("--smtp-latency", type=float, default=0, help="SMTP 명령당 지연(ms)")
+    parser.add_argument("--telegram-latency", type=float, default=0, help="텔레그램 API 호출당 지연(ms)")
+    parser.add_argument("--only", nargs="+", help="측정할 항목 이름 (예: record_expiring_users expired_command)")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc 끄기 (시간 측정 왜곡 방지)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    parser.add_argument("--verbose", action="store_true", help="앱 로그 출력")
+    args = parser.parse_args(argv)
+    args.sheet_latency /= 1000
+    args.smtp_latency /= 1000
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL, force=True)
+    os.chdir(ROOT)  # 이메일 템플릿 상대 경로 기준
+
+    with fakes.FakeTelegramServer(latency=args.telegram_latency / 1000) as tg:
+        from utils import telegram_helper
+        telegram_helper.TELEGRAM_API_BASE = tg.base_url
+
+        import bot
+        logging.disable(logging.NOTSET if args.verbose else logging.CRITICAL)
+
+        results = []
+        for n in args.sizes:
+            size_results = run_size(n, args)
+            print_table(size_results)
+            results.extend(size_results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
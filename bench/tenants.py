@@ -0,0 +1,73 @@
+"""
+여러 테넌트(스프레드시트) daily_check 로컬 측정
+
+스프레드시트 N개를 시트 대역으로 만들고 daily_check를 TENANT_WORKERS 값별로 실행해
+전체 소요 시간과 테넌트별 결과(발송 메일 수, 시트 호출 수)를 비교합니다.
+병렬 실행이면 전체 시간이 테넌트 시간의 합이 아니라 가장 느린 테넌트 수준이어야 합니다.
+
+사용 예)
+    python -m bench.tenants
+    python -m bench.tenants --tenants 6 --users 2000 --sheet-latency 200 --smtp-latency 50 --workers 1 6
+"""
+import argparse
+import logging
+import os
+import time
+
+from bench import fakes
+from bench.run import ROOT, install_fakes
+
+def make_tenants(n, quota):
+    from utils.tenant import Tenant
+    return [
+        Tenant(
+            name=f"group{i}",
+            spreadsheet_id=f"bench-tenant-{i}",
+            deposit_account=f"벤치은행 000-{i:03d}",
+            kakao_link=f"http://pf.kakao.com/_bench{i}/chat",
+            email_quota=quota,
+        )
+        for i in range(n)
+    ]
+
+def run_once(workers, args):
+    """daily_check 1회 → 소요 시간(초)"""
+    import daily_check
+    tenants = make_tenants(args.tenants, args.quota)
+    install_fakes(args.users, args.sheet_latency, args.smtp_latency, [t.spreadsheet_id for t in tenants])
+    daily_check.TENANT_WORKERS = workers
+    fakes.calls.reset()
+    started = time.perf_counter()
+    daily_check.daily_check(tenants)
+    return time.perf_counter() - started
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="멀티 테넌트 daily_check 벤치마크")
+    parser.add_argument("--tenants", type=int, default=4, help="테넌트(스프레드시트) 수")
+    parser.add_argument("--users", type=int, default=1000, help="테넌트당 사용자 시트 행 수")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="비교할 TENANT_WORKERS 값")
+    parser.add_argument("--quota", type=int, default=0, help="테넌트당 메일 발송 한도 (0이면 제한 없음)")
+    parser.add_argument("--sheet-latency", type=float, default=100, help="시트 API 호출당 지연(ms)")
+    parser.add_argument("--smtp-latency", type=float, default=20, help="SMTP 호출당 지연(ms)")
+    parser.add_argument("--verbose", action="store_true", help="앱 로그 출력")
+    args = parser.parse_args(argv)
+    args.sheet_latency /= 1000
+    args.smtp_latency /= 1000
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL, force=True)
+    os.chdir(ROOT)
+
+    with fakes.FakeTelegramServer() as tg:
+        from utils import telegram_helper
+        telegram_helper.TELEGRAM_API_BASE = tg.base_url
+        print(f"{'workers':>7} {'tenants':>7} {'wall(s)':>9}  summary")
+        for workers in args.workers:
+            tg.sent.clear()
+            wall = run_once(workers, args)
+            summary = next((text for _, text in tg.sent if text.startswith("📋")), "(요약 없음)")
+            print(f"{workers:>7} {args.tenants:>7} {wall:>9.3f}  {summary.splitlines()[0]}")
+            if args.verbose:
+                print(summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+웹훅 모드 로컬 측정
+
+FakeTelegramServer를 Bot API 대역으로 두고 봇을 웹훅 모드로 띄운 뒤,
+여러 채팅방에서 명령어를 연달아 보내 마지막 응답까지 걸린 시간과 채팅방별 응답 순서를 확인합니다.
+동시 처리 수(concurrent_updates)를 1(순차 처리)과 비교합니다.
+
+사용 예)
+    python -m bench.webhook
+    python -m bench.webhook --chats 5 --per-chat 10 --sheet-latency 200 --concurrency 1 8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import urllib.request
+
+from bench import fakes
+from bench.run import ROOT, install_fakes
+
+WEBHOOK_PATH = "telegram"
+WEBHOOK_SECRET = "bench-secret"
+
+# 명령어 → 응답 종류 (응답 첫 글자로 구분)
+COMMANDS = [(".오늘만료", ("❗", "📭")), (".도움말", ("🛠",))]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def make_update(update_id, chat_id, text):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"admin{chat_id}"},
+            "text": text,
+        },
+    }
+
+def post_update(url, update):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(update).encode(),
+        headers={"Content-Type": "application/json", "X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        response.read()
+
+async def run_once(bot, tg, concurrency, args):
+    """봇을 웹훅으로 띄우고 명령어를 보낸 뒤 (소요 시간, 순서 위반 채팅방 수)를 반환"""
+    # 매 측정마다 빈 캐시에서 시작 (첫 .오늘만료가 시트를 읽음)
+    install_fakes(args.users, args.sheet_latency, 0)
+
+    port = free_port()
+    app = bot.build_application(token="1:bench", api_base=tg.base_url, concurrent_updates=concurrency)
+    await app.initialize()
+    await app.updater.start_webhook(
+        listen="127.0.0.1", port=port, url_path=WEBHOOK_PATH, secret_token=WEBHOOK_SECRET
+    )
+    await app.start()
+
+    chats = [1000 + c for c in range(args.chats)]
+    expected = {chat: [] for chat in chats}
+    updates = []
+    for i in range(args.per_chat):
+        for chat in chats:
+            text, kinds = COMMANDS[i % len(COMMANDS)]
+            updates.append(make_update(len(updates) + 1, chat, text))
+            expected[chat].append(kinds)
+
+    tg.sent.clear()
+    url = f"http://127.0.0.1:{port}/{WEBHOOK_PATH}"
+    started = time.perf_counter()
+    for update in updates:
+        await asyncio.to_thread(post_update, url, update)
+    deadline = time.monotonic() + args.timeout
+    while len(tg.sent) < len(updates) and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+    wall = time.perf_counter() - started
+
+    await app.updater.stop()
+    await app.stop()
+    await app.shutdown()
+
+    replies = {chat: [] for chat in chats}
+    for chat_id, text in tg.sent:
+        if chat_id in replies:
+            replies[chat_id].append(text)
+    out_of_order = sum(
+        1 for chat in chats
+        if len(replies[chat]) != len(expected[chat])
+        or not all(text.startswith(kinds) for text, kinds in zip(replies[chat], expected[chat]))
+    )
+    return wall, len(tg.sent), out_of_order
+
+async def amain(args):
+    with fakes.FakeTelegramServer(latency=args.telegram_latency) as tg:
+        from utils import telegram_helper
+        telegram_helper.TELEGRAM_API_BASE = tg.base_url
+
+        import bot
+        logging.disable(logging.NOTSET if args.verbose else logging.CRITICAL)
+        # 측정 중에는 예약 작업/시작 점검을 띄우지 않음
+        bot.DAILY_CHECK_ON_START = False
+        bot.STARTUP_HEALTH_CHECK = False
+
+        total = args.chats * args.per_chat
+        print(f"{'concurrency':>11}  {'updates':>7} {'replies':>7} {'wall(s)':>9}  out-of-order chats")
+        for concurrency in args.concurrency:
+            wall, replies, out_of_order = await run_once(bot, tg, concurrency, args)
+            print(f"{concurrency:>11}  {total:>7} {replies:>7} {wall:>9.3f}  {out_of_order}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="웹훅 모드 동시 처리 벤치마크")
+    parser.add_argument("--users", type=int, default=1000, help="사용자 시트 행 수")
+    parser.add_argument("--chats", type=int, default=5, help="명령어를 보내는 채팅방 수")
+    parser.add_argument("--per-chat", type=int, default=6, help="채팅방당 명령어 수")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="비교할 concurrent_updates 값")
+    parser.add_argument("--sheet-latency", type=float, default=200, help="시트 API 호출당 지연(ms)")
+    parser.add_argument("--telegram-latency", type=float, default=20, help="텔레그램 API 호출당 지연(ms)")
+    parser.add_argument("--timeout", type=float, default=60, help="응답 대기 한도(초)")
+    parser.add_argument("--verbose", action="store_true", help="앱 로그 출력")
+    args = parser.parse_args(argv)
+    args.sheet_latency /= 1000
+    args.telegram_latency /= 1000
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL, force=True)
+    os.chdir(ROOT)
+    asyncio.run(amain(args))
+
+if __name__ == "__main__":
+    main()
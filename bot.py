@@ -1,15 +1,40 @@
+import time
+
+# 시작 시간 측정 기준 (import 포함)
+_STARTED = time.perf_counter()
+
 import logging
 import asyncio
-from datetime import datetime, timedelta
-from telegram import Update
+from collections import deque
+from datetime import datetime, time as dtime
+from zoneinfo import ZoneInfo
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
+    Application,
     ApplicationBuilder,
+    CallbackQueryHandler,
     MessageHandler,
     ContextTypes,
     filters
 )
 import os
-from utils.sheet_helper import get_sheet_df, append_row
+from utils.user_cache import get_users, get_expiry_index, get_group_occupancy, invalidate_users, USER_CACHE_TTL
+from utils.replica import async_sync_all as sync_replica, async_iter_sheet_records, REPLICA_SYNC_INTERVAL
+from utils.export import send_export, phone_rows, EXPORT_FORMAT
+from utils.paging import PagedResult, store_result, get_result
+from utils import metrics
+from utils.metrics import timed
+from utils.telegram_helper import TELEGRAM_API_BASE
+from daily_check import (
+    daily_check,
+    is_running as daily_check_running,
+    DAILY_CHECK_TIME,
+    DAILY_CHECK_TZ,
+    DAILY_CHECK_ON_START
+)
+
+# pandas/gspread는 여기서 불러오지 않음 (첫 사용 또는 시작 후 백그라운드 점검 때 로드)
+IMPORT_SECONDS = time.perf_counter() - _STARTED
 
 # 디버그 로그 설정
 logging.basicConfig(level=logging.INFO)
@@ -19,24 +44,89 @@ TELEGRAM_TOKEN = os.environ['TELEGRAM_TOKEN']
 ADMIN_CHAT_ID = os.environ['ADMIN_CHAT_ID']
 SPREADSHEET_ID = os.environ['SPREADSHEET_ID']
 GOOGLE_JSON_KEY = os.environ['GOOGLE_JSON_KEY']
+# Prometheus 텍스트 형식 지표 파일 경로/저장 주기(초) — 비워 두면 저장 안 함
+METRICS_DUMP_PATH = os.environ.get("METRICS_DUMP_PATH", "")
+METRICS_DUMP_INTERVAL = float(os.environ.get("METRICS_DUMP_INTERVAL", "60"))
+# 동시에 처리할 업데이트 수 (같은 채팅방 안에서는 항상 순서대로 처리)
+BOT_CONCURRENT_UPDATES = int(os.environ.get("BOT_CONCURRENT_UPDATES", "8"))
+# 웹훅 모드: WEBHOOK_URL(외부에서 보이는 주소)을 지정하면 폴링 대신 웹훅으로 받음
+# 로컬 리버스 프록시 뒤에서 WEBHOOK_LISTEN:WEBHOOK_PORT/WEBHOOK_PATH로 수신
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+# .빈자리에서 "곧 빌 자리"로 보는 기본 기간(일)
+VACANCY_DAYS = int(os.environ.get("VACANCY_DAYS", "7"))
+# .빈자리 그룹별로 보여 줄 곧 빌 자리 최대 인원, 한 줄에 보여 줄 이름 최대 길이
+VACANCY_SOON_LIMIT = 5
+VACANCY_NAME_LIMIT = 20
+# 시작 직후 백그라운드에서 시트 연동을 확인할지 여부 (무거운 모듈도 이때 미리 로드)
+STARTUP_HEALTH_CHECK = os.environ.get("STARTUP_HEALTH_CHECK", "1") == "1"
 
-# 시트에서 사용자 불러오기
-def load_users():
-    logging.info("🧾 [load_users] 시트에서 사용자 데이터 로딩 중...")
-    df = get_sheet_df("user_data")
-    logging.info(f"✅ [load_users] 총 {len(df)}명 로드됨.")
-    return df.to_dict(orient="records")
+# 캐시된 스냅샷에서 사용자 불러오기 (TTL 경과 시에만 시트 조회)
+async def load_users():
+    return await get_users()
 
 # 사용자 정보를 보기 좋게 포맷
 def format_user_entry(user):
-    name = user.get("이름", "이름없음")
-    email = user.get("이메일", "이메일없음")
-    group = user.get("그룹", "")
-    group_num = user.get("그룹 번호", "")
+    name = user.name or "이름없음"
+    email = user.email or "이메일없음"
+    group = str(user.group)
     admin = group.split('@')[0] if "@" in group else group
-    return f"👤 {name}\n📧 {email}\n👑 {admin}('{group_num}')"
+    return f"👤 {name}\n📧 {email}\n👑 {admin}('{user.group_no}')"
+
+# 긴 이름은 잘라서 한 항목이 지나치게 길어지지 않도록
+def clip(text, limit):
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+# 그룹 인원 요약 한 줄 묶음 (.빈자리) — entry는 (오늘, 정원, (그룹 키, 인원, 빈자리, 곧 빌 자리))
+def format_group_entry(entry):
+    today, capacity, ((group, number), used, free, soon) = entry
+    admin = clip(group.split('@')[0] if "@" in group else group, VACANCY_NAME_LIMIT)
+    lines = [f"👑 {admin}('{number}') · {used}/{capacity}명" + (f" · 🪑 빈자리 {free}" if free else "")]
+    if used > capacity:
+        lines.append(f"⚠️ 정원 {used - capacity}명 초과")
+    for exp, name in soon[:VACANCY_SOON_LIMIT]:
+        note = " (만료됨)" if exp < today else " (오늘 만료)" if exp == today else ""
+        lines.append(f"⏳ {exp} {clip(name or '이름없음', VACANCY_NAME_LIMIT)}{note}")
+    if len(soon) > VACANCY_SOON_LIMIT:
+        lines.append(f"⏳ … 외 {len(soon) - VACANCY_SOON_LIMIT}명")
+    return "\n".join(lines)
+
+# 페이지 이동 버튼 (결과가 한 페이지면 버튼 없음)
+def page_keyboard(result_id, result, page):
+    if result.pages <= 1:
+        return None
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("◀ 이전", callback_data=f"page:{result_id}:{page - 1}"))
+    if page < result.pages - 1:
+        buttons.append(InlineKeyboardButton("다음 ▶", callback_data=f"page:{result_id}:{page + 1}"))
+    return InlineKeyboardMarkup([buttons])
+
+# 결과 첫 페이지 전송 (나머지 페이지는 버튼을 누를 때 그 부분만 포맷)
+async def reply_paged(update: Update, title, items, formatter=format_user_entry, unit="명", fit_length=False):
+    result = PagedResult(title, items, formatter, unit=unit, fit_length=fit_length)
+    result_id = store_result(result)
+    await update.message.reply_text(result.render(0), reply_markup=page_keyboard(result_id, result, 0))
+
+# 페이지 이동 버튼 처리
+@timed("bot.page_callback")
+async def page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    _, result_id, page = query.data.split(":")
+    result = get_result(result_id)
+    if result is None:
+        await query.edit_message_text("⌛ 조회 결과가 만료되었습니다. 명령어를 다시 입력해 주세요.")
+        return
+    page = int(page)
+    await query.edit_message_text(result.render(page), reply_markup=page_keyboard(result_id, result, page))
 
 # .도움말 명령어 처리
+@timed("bot.help_command")
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logging.info("[명령어] .도움말 실행됨")
     await update.message.reply_text(
@@ -44,10 +134,25 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ".도움말 - 도움말 보기\n"
         ".만료 N - 오늘 기준 N일 후/전 만료자 확인 (예: .만료 3)\n"
         ".오늘만료 - 오늘 만료되는 사용자\n"
-        ".무료 사용자 - 무료 사용자 목록"
+        ".무료 사용자 - 무료 사용자 목록\n"
+        ".빈자리 N - 그룹별 빈자리와 N일(기본 7일) 내 빌 자리\n"
+        ".새로고침 - 시트와 동기화해 사용자 데이터 다시 불러오기\n"
+        ".점검 - 매일 자동 점검(daily_check) 지금 실행 (관리자)\n"
+        ".통계 - 응답 시간/API 호출 통계 (관리자)\n"
+        ".내보내기 전체|만료 N|오늘만료|번호 [csv|xlsx] - 파일로 받기 (관리자)"
+    )
+
+# .새로고침 명령어 처리
+@timed("bot.refresh_command")
+async def refresh_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    logging.info("[명령어] .새로고침 실행됨")
+    users = await get_users(force_refresh=True)
+    await update.message.reply_text(
+        f"🔄 사용자 데이터를 새로 불러왔습니다. (총 {len(users)}명, 캐시 유지 {int(USER_CACHE_TTL)}초)"
     )
 
 # .만료 N 명령어 처리
+@timed("bot.expired_command")
 async def expired_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logging.info("[명령어] .만료 N 실행됨")
     try:
@@ -57,104 +162,326 @@ async def expired_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     today = datetime.now().date()
-    users = load_users()
-    groups = {}
+    index = await get_expiry_index()
+    items = []
 
-    for user in users:
-        try:
-            exp_date = datetime.strptime(user.get("만료일", ""), "%Y-%m-%d").date()
-            logging.info(f"🔍 {user.get('이름')} 만료일: {exp_date}")
-        except Exception as e:
-            logging.warning(f"⚠️ {user.get('이름')} 만료일 파싱 실패: {e}")
-            continue
-
-        if n > 0 and today < exp_date <= today + timedelta(days=n):
-            key = f"❗만료 {exp_date - today} 후 ({exp_date})"
-        elif n < 0 and today + timedelta(days=n) <= exp_date < today:
-            key = f"❗만료 {today - exp_date} 전 ({exp_date})"
-        elif n == 0 and exp_date == today:
-            key = f"❗만료 오늘 ({today})"
-        else:
-            continue
+    # 인덱스가 만료일 순으로 돌려주므로 그룹도 날짜 순으로 쌓인다 (그룹 제목은 날짜별로 한 번만 생성)
+    key, key_date = None, None
+    for exp_date, user in index.within_days(today, n):
+        if exp_date != key_date:
+            key_date = exp_date
+            if n > 0:
+                key = f"❗만료 {exp_date - today} 후 ({exp_date})"
+            elif n < 0:
+                key = f"❗만료 {today - exp_date} 전 ({exp_date})"
+            else:
+                key = f"❗만료 오늘 ({today})"
+        items.append((key, user))
 
-        groups.setdefault(key, []).append(format_user_entry(user))
-
-    if groups:
-        msg = ""
-        for k in sorted(groups.keys()):
-            msg += f"{k}\n\n" + "\n\n".join(groups[k]) + "\n\n"
-        await update.message.reply_text(msg.strip())
+    if items:
+        await reply_paged(update, "", items)
     else:
         await update.message.reply_text("📭 해당 조건의 만료 대상자가 없습니다.")
 
 # .오늘만료 명령어 처리
+@timed("bot.today_expired_command")
 async def today_expired_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logging.info("[명령어] .오늘만료 실행됨")
     today = datetime.now().date()
-    users = load_users()
-    entries = []
+    index = await get_expiry_index()
+    items = [("", user) for user in index.on(today)]
 
-    for user in users:
-        try:
-            exp_date = datetime.strptime(user.get("만료일", ""), "%Y-%m-%d").date()
-            if exp_date == today:
-                entries.append(format_user_entry(user))
-        except Exception as e:
-            logging.warning(f"⚠️ {user.get('이름')} 날짜 파싱 실패: {e}")
-            continue
-
-    if entries:
-        msg = f"❗오늘 만료 ({today})\n\n" + "\n\n".join(entries)
-        await update.message.reply_text(msg)
+    if items:
+        await reply_paged(update, f"❗오늘 만료 ({today})", items)
     else:
         await update.message.reply_text("📭 오늘 만료되는 사용자가 없습니다.")
 
 # .무료 사용자 명령어 처리
+@timed("bot.free_users_command")
 async def free_users_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logging.info("[명령어] .무료 사용자 실행됨")
-    users = load_users()
-    entries = []
-
-    for user in users:
-        if (user.get("지인 여부", "").strip().upper() == "O" and
-            user.get("결제 여부", "").strip().upper() == "X" and
-            not user.get("만료일", "").strip()):
-            entries.append(format_user_entry(user))
-
-    if entries:
-        msg = "🎁 무료 사용자 목록:\n\n" + "\n\n".join(entries)
-        await update.message.reply_text(msg)
+    users = await load_users()
+    items = [
+        ("", user) for user in users
+        if (str(user.friend).strip().upper() == "O" and
+            str(user.paid).strip().upper() == "X" and
+            not str(user.expire).strip())
+    ]
+
+    if items:
+        await reply_paged(update, "🎁 무료 사용자 목록:", items)
     else:
         await update.message.reply_text("📭 무료 사용자가 없습니다.")
 
-# 메인 실행 함수
-async def main():
-    logging.info("🚀 봇 시작 준비 중...")
-    app = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+# .빈자리 [N] 명령어 처리 — 그룹 인원 인덱스에서 바로 응답 (시트 전체 집계 없음)
+@timed("bot.vacancy_command")
+async def vacancy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    logging.info("[명령어] .빈자리 실행됨")
+    days = context.matches[0].group(1) if context.matches else None
+    days = int(days) if days else VACANCY_DAYS
+
+    today = datetime.now().date()
+    occupancy = await get_group_occupancy()
+    groups = occupancy.summary(today, days)
+    # 빈자리가 있는 그룹을 먼저, 그다음 곧 빌 자리가 있는 그룹 (각각 그룹 순)
+    items = [("", (today, occupancy.capacity, group)) for group in groups if group[2]]
+    items += [("", (today, occupancy.capacity, group)) for group in groups if not group[2] and group[3]]
+
+    if not items:
+        await update.message.reply_text(f"📭 빈자리나 {days}일 안에 빌 자리가 없습니다. (그룹 {len(groups)}개)")
+        return
+    total_free = sum(group[2] for group in groups)
+    total_soon = sum(len(group[3]) for group in groups)
+    title = (
+        f"🪑 빈자리 현황 (그룹 {len(groups)}개, 정원 {occupancy.capacity}명)\n"
+        f"빈자리 {total_free}석 · {days}일 안에 빌 자리 {total_soon}석"
+    )
+    await reply_paged(update, title, items, format_group_entry, unit="개 그룹", fit_length=True)
+
+# 만료 대상 파일 열
+EXPIRY_EXPORT_COLUMNS = ["만료일", "이름", "이메일", "전화번호", "그룹", "그룹 번호"]
+
+def _sheet_rows(header, records):
+    for record in records:
+        yield [record.get(column, "") for column in header]
+
+def _expiry_rows(items):
+    for exp_date, user in items:
+        yield [str(exp_date), user.name, user.email, user.phone, user.group, user.group_no]
+
+# .내보내기 명령어 처리 (관리자 채팅방만) — 행을 파일에 하나씩 쓰고 문서로 전송
+@timed("bot.export_command")
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    logging.info("[명령어] .내보내기 실행됨")
+    target, fmt = context.matches[0].group(1, 2) if context.matches else (None, None)
+    if not target:
+        await update.message.reply_text(
+            "❌ 형식: .내보내기 전체|만료 N|오늘만료|번호 [csv|xlsx]\n예) .내보내기 만료 7 csv"
+        )
+        return
+    fmt = (fmt or EXPORT_FORMAT).lower()
+    target = " ".join(target.split())
+    today = datetime.now().date()
+
+    if target == "전체":
+        # 로컬 사본에서 바로 흘려 씀 (스냅샷 전체를 다시 만들지 않음)
+        header, records = await async_iter_sheet_records("user_data")
+        name, caption, rows = "users", "📄 전체 사용자 {count}명", _sheet_rows(header, records)
+    elif target == "번호":
+        header = ["이름", "전화번호"]
+        _, records = await async_iter_sheet_records("extends_data")
+        rows = phone_rows((record.get("이름", ""), record.get("전화번호", "")) for record in records)
+        name, caption = "sms", "📄 문자 발송 대상 {count}명"
+    else:
+        n = 0 if target == "오늘만료" else int(target.replace("만료", ""))
+        index = await get_expiry_index()
+        header = EXPIRY_EXPORT_COLUMNS
+        name = "expire_today" if n == 0 else f"expire_{n}" if n > 0 else f"expired_{-n}"
+        if n > 0:
+            caption = f"📄 {n}일 안에 만료 {{count}}명"
+        elif n < 0:
+            caption = f"📄 최근 {-n}일 사이 만료 {{count}}명"
+        else:
+            caption = f"📄 오늘 만료 ({today}) {{count}}명"
+        rows = _expiry_rows(index.within_days(today, n))
+
+    sent = await asyncio.to_thread(send_export, name, header, rows, caption, fmt, update.effective_chat.id)
+    if sent == 0:
+        await update.message.reply_text("📭 내보낼 대상이 없습니다.")
+    elif sent is None:
+        await update.message.reply_text("❗ 파일 전송에 실패했습니다. 잠시 후 다시 시도해 주세요.")
+
+# .통계 명령어 처리 (관리자 채팅방만)
+@timed("bot.stats_command")
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    logging.info("[명령어] .통계 실행됨")
+    await update.message.reply_text(metrics.format_summary())
+
+# daily_check를 별도 스레드에서 실행 (겹치면 건너뜀), 끝나면 사용자 스냅샷 갱신 예약
+async def run_daily_check():
+    ran = await asyncio.to_thread(daily_check)
+    if ran:
+        invalidate_users()
+    return ran
+
+# JobQueue 예약 실행
+async def daily_check_job(context: ContextTypes.DEFAULT_TYPE):
+    logging.info("[스케줄] daily_check 실행")
+    await run_daily_check()
 
-    # 명령어 핸들러 등록
+# .점검 명령어 처리
+@timed("bot.check_command")
+async def check_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    logging.info("[명령어] .점검 실행됨")
+    if daily_check_running():
+        await update.message.reply_text("⏳ 이미 점검이 진행 중입니다.")
+        return
+    await update.message.reply_text("🔧 점검을 시작합니다. 결과는 알림으로 전송됩니다.")
+    if not await run_daily_check():
+        await update.message.reply_text("⏳ 이미 점검이 진행 중입니다.")
+
+# 매일 daily_check 예약 (python-telegram-bot[job-queue] 필요)
+def schedule_daily_check(app):
+    if app.job_queue is None:
+        logging.warning("⚠️ JobQueue 없음 — python-telegram-bot[job-queue] 설치 필요, 자동 점검 비활성화")
+        return
+    hour, minute = map(int, DAILY_CHECK_TIME.split(":"))
+    at = dtime(hour, minute, tzinfo=ZoneInfo(DAILY_CHECK_TZ))
+    app.job_queue.run_daily(daily_check_job, time=at, days=tuple(range(7)), name="daily_check")
+    logging.info(f"⏰ daily_check 예약: 매일 {DAILY_CHECK_TIME} ({DAILY_CHECK_TZ})")
+    if DAILY_CHECK_ON_START:
+        app.job_queue.run_once(daily_check_job, when=5, name="daily_check_startup")
+
+# 로컬 사본 주기 동기화 (바뀐 행이 있으면 사용자 스냅샷 갱신 예약)
+async def sync_replica_job(context: ContextTypes.DEFAULT_TYPE):
+    changed = await sync_replica()
+    if changed:
+        invalidate_users()
+
+def schedule_replica_sync(app):
+    if app.job_queue is None or REPLICA_SYNC_INTERVAL <= 0:
+        return
+    app.job_queue.run_repeating(
+        sync_replica_job, interval=REPLICA_SYNC_INTERVAL, first=REPLICA_SYNC_INTERVAL, name="replica_sync"
+    )
+    logging.info(f"🗄 로컬 사본 동기화 예약: {int(REPLICA_SYNC_INTERVAL)}초마다")
+
+# 지표를 Prometheus 텍스트 파일로 주기 저장 (METRICS_DUMP_PATH를 지정한 경우만)
+async def metrics_dump_job(context: ContextTypes.DEFAULT_TYPE):
+    await asyncio.to_thread(metrics.write_prometheus, METRICS_DUMP_PATH)
+
+def schedule_metrics_dump(app):
+    if app.job_queue is None or not METRICS_DUMP_PATH or not metrics.METRICS_ENABLED:
+        return
+    app.job_queue.run_repeating(metrics_dump_job, interval=METRICS_DUMP_INTERVAL, first=METRICS_DUMP_INTERVAL, name="metrics_dump")
+    logging.info(f"📊 지표 저장 예약: {METRICS_DUMP_PATH} ({int(METRICS_DUMP_INTERVAL)}초마다)")
+
+# 시작 후 백그라운드 점검: 로컬 사본을 시트와 동기화하고 사용자 스냅샷을 미리 만들어 둠
+async def startup_health_check(context: ContextTypes.DEFAULT_TYPE):
+    started = time.perf_counter()
+    try:
+        await sync_replica()
+        users = await get_users(force_refresh=True)
+    except Exception as e:
+        logging.error(f"❌ [시작 점검] 시트 연동 실패: {e}")
+        await context.bot.send_message(ADMIN_CHAT_ID, f"⚠️ 봇 시작 점검: 시트 연동 실패 ({e})")
+        return
+    logging.info(f"🩺 [시작 점검] 사용자 {len(users)}명 확인 ({time.perf_counter() - started:.2f}초)")
+
+# 폴링 시작 직전: 시작 시간 보고 + 백그라운드 점검 예약
+async def on_startup(app):
+    logging.info(
+        f"⚡ 시작 준비 완료: import {IMPORT_SECONDS * 1000:.0f}ms, "
+        f"전체 {(time.perf_counter() - _STARTED) * 1000:.0f}ms"
+    )
+    if STARTUP_HEALTH_CHECK and app.job_queue is not None:
+        app.job_queue.run_once(startup_health_check, when=0, name="startup_health_check")
+
+# 핸들러 예외 처리 (시트 응답 지연 등)
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
+    if isinstance(context.error, asyncio.TimeoutError):
+        logging.warning("⚠️ 시트 응답 시간 초과")
+        text = "⏳ 구글 시트 응답이 지연되고 있습니다. 잠시 후 다시 시도해 주세요."
+    else:
+        logging.error(f"❌ 핸들러 오류: {context.error}")
+        text = f"❌ 처리 중 오류가 발생했습니다: {context.error}"
+    if isinstance(update, Update) and update.effective_message:
+        await update.effective_message.reply_text(text)
+
+class ChatOrderedApplication(Application):
+    """
+    concurrent_updates로 여러 업데이트를 동시에 처리하되,
+    같은 채팅방의 업데이트는 도착한 순서대로 하나씩 처리하는 Application.
+    채팅방마다 대기열을 두고, 그 채팅방을 처리 중인 작업이 대기열을 이어서 비웁니다.
+    뒤에 온 업데이트는 대기열에 넣고 바로 끝나므로 동시 처리 자리(concurrent_updates)를
+    차지한 채 기다리지 않고, 한 채팅방이 몰려도 다른 채팅방은 막히지 않습니다.
+    (핸들러가 block=False면 순서 보장 범위는 핸들러 시작까지)
+    """
+
+    __slots__ = ("_chat_queues",)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # 채팅방 id → 처리 대기 중인 업데이트 (키가 있으면 그 채팅방을 처리 중인 작업이 있음)
+        self._chat_queues = {}
+
+    async def process_update(self, update):
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            await super().process_update(update)
+            return
+
+        queue = self._chat_queues.get(chat.id)
+        if queue is not None:
+            queue.append(update)
+            return
+
+        queue = self._chat_queues[chat.id] = deque([update])
+        try:
+            while queue:
+                await super().process_update(queue.popleft())
+        finally:
+            if queue:
+                logging.error(f"❌ 채팅방 {chat.id} 처리 중단 — 대기 중인 업데이트 {len(queue)}개 버림")
+            del self._chat_queues[chat.id]
+
+# 핸들러/작업 등록까지 마친 Application 생성 (폴링/웹훅 공용)
+def build_application(token=TELEGRAM_TOKEN, api_base=TELEGRAM_API_BASE, concurrent_updates=BOT_CONCURRENT_UPDATES):
+    app = (
+        ApplicationBuilder()
+        .application_class(ChatOrderedApplication)
+        .token(token)
+        .base_url(f"{api_base}/bot")
+        .concurrent_updates(concurrent_updates)
+        .post_init(on_startup)
+        .build()
+    )
+
+    # 명령어 핸들러 등록 (업데이트끼리는 동시에, 같은 채팅방 안에서는 순서대로 처리)
+    # .점검은 오래 걸리므로 block=False로 띄워 두고 같은 채팅방의 다음 명령을 막지 않음
     app.add_handler(MessageHandler(filters.Regex(r'^\.도움말$'), help_command))
     app.add_handler(MessageHandler(filters.Regex(r'^\.오늘만료$'), today_expired_command))
     app.add_handler(MessageHandler(filters.Regex(r'^\.만료\s*(-?\d+)$'), expired_command))
     app.add_handler(MessageHandler(filters.Regex(r'^\.무료\s*사용자$'), free_users_command))
+    app.add_handler(MessageHandler(filters.Regex(r'^\.빈자리\s*(\d+)?$'), vacancy_command))
+    app.add_handler(MessageHandler(filters.Regex(r'^\.새로고침$'), refresh_command))
+    app.add_handler(MessageHandler(
+        filters.Regex(r'^\.점검$') & filters.Chat(chat_id=int(ADMIN_CHAT_ID)), check_command, block=False
+    ))
+    app.add_handler(MessageHandler(
+        filters.Regex(r'^\.통계$') & filters.Chat(chat_id=int(ADMIN_CHAT_ID)), stats_command
+    ))
+    app.add_handler(MessageHandler(
+        filters.Regex(r'^\.내보내기(?:\s+(전체|만료\s*-?\d+|오늘만료|번호))?(?:\s+(?i:(csv|xlsx)))?$')
+        & filters.Chat(chat_id=int(ADMIN_CHAT_ID)),
+        export_command
+    ))
+    app.add_handler(CallbackQueryHandler(page_callback, pattern=r'^page:'))
+    app.add_error_handler(error_handler)
+    schedule_daily_check(app)
+    schedule_replica_sync(app)
+    schedule_metrics_dump(app)
+    return app
 
-    logging.info("✅ 핸들러 등록 완료")
-    await app.run_polling()
-    logging.info("📡 폴링 시작됨")
-
-# 여기서 시트 연동 테스트도 함께 진행
-if __name__ == "__main__":
-    import nest_asyncio
-    nest_asyncio.apply()
-
-    try:
-        # 시트 연동 테스트용
-        logging.info("🧪 [테스트] 구글 시트 연동 테스트 시작")
-        df = get_sheet_df("user_data")
-        logging.info(f"🧪 [테스트] 시트에서 {len(df)}명 로딩 성공")
-        logging.info(f"\n{df.head(5).to_string()}")
+# 메인 실행 함수
+def main():
+    logging.info("🚀 봇 시작 준비 중...")
+    app = build_application()
+    logging.info(f"✅ 핸들러 등록 완료 (동시 처리 {BOT_CONCURRENT_UPDATES}건)")
 
-    except Exception as e:
-        logging.error(f"❌ [테스트] 시트 연동 실패: {e}")
+    if WEBHOOK_URL:
+        logging.info(f"🌐 웹훅 수신: {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH} ← {WEBHOOK_URL}")
+        app.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET or None,
+        )
+    else:
+        logging.info("📡 폴링 시작")
+        app.run_polling()
 
-    asyncio.run(main())
+# 시트 연동 확인은 시작 후 백그라운드 점검(startup_health_check)이 대신함
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,117 @@
-import time
-import schedule
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from utils.payment_logic import (
-    record_expiring_users,
-    check_payment_and_extend,
-    handle_phone_list_for_sms
-)
-from utils.telegram_helper import send_telegram_message
+from utils.lazy import lazy_import
+from utils.metrics import track
+from utils.telegram_helper import send_telegram_message, coalesce_messages
+from utils.tenant import load_tenants, use_tenant
 
 logging.basicConfig(level=logging.INFO)
 
-def daily_check():
+# pandas/gspread를 끌고 오므로 봇 시작 때가 아니라 첫 실행 때 불러옴
+payment_logic = lazy_import("utils.payment_logic")
+
+# 매일 실행 시각/시간대 (bot.py의 JobQueue가 이 값으로 예약)
+DAILY_CHECK_TIME = os.environ.get("DAILY_CHECK_TIME", "09:30")
+DAILY_CHECK_TZ = os.environ.get("DAILY_CHECK_TZ", "Asia/Seoul")
+# 봇 시작 직후에도 한 번 실행할지 여부
+DAILY_CHECK_ON_START = os.environ.get("DAILY_CHECK_ON_START", "1") == "1"
+# 여러 테넌트를 동시에 처리할 스레드 수 (시트/SMTP 대기가 대부분이라 스레드로 충분)
+TENANT_WORKERS = int(os.environ.get("TENANT_WORKERS", "4"))
+
+# 정기 실행과 .점검 수동 실행이 겹치지 않도록
+_run_lock = threading.Lock()
+
+def is_running():
+    return _run_lock.locked()
+
+def run_tenant(tenant, labeled=False):
     """
+    테넌트 하나의 daily_check.
     1) 만료 대상 기록 + 이메일 발송
     2) 입금 확인 후 연장/삭제
     3) 문자 발송용 번호 목록 알림
+    시트는 처음에 한 번만 읽고, 변경 사항은 마지막에 한꺼번에 반영합니다.
+    알림은 테넌트별로 모았다가 묶어서 보내고(labeled면 맨 앞에 테넌트 이름), 결과 요약 dict를 반환합니다.
+    오류는 이 테넌트 안에서만 처리하고 다른 테넌트에는 영향을 주지 않습니다.
+    """
+    result = {"tenant": tenant.label, "ok": False, "error": "", "stats": {}, "seconds": 0.0}
+    started = time.perf_counter()
+    with use_tenant(tenant), track(f"daily.tenant.{tenant.name or 'default'}") as t, coalesce_messages():
+        if labeled:
+            send_telegram_message(f"🏷 [{tenant.label}]")
+        try:
+            with track("daily.load"):
+                run = payment_logic.DailyRun()
+            payment_logic.record_expiring_users(run)
+            payment_logic.check_payment_and_extend(run)
+            payment_logic.handle_phone_list_for_sms(run)
+            run.commit()
+            result["ok"] = True
+            result["stats"] = run.stats
+            send_telegram_message("✅ [daily_check] 전체 프로세스 완료")
+        except Exception as e:
+            t.fail()
+            result["error"] = str(e)
+            send_telegram_message(f"❗ [daily_check] 오류 발생: {e}")
+            logging.error(f"[daily_check] '{tenant.label}' 예외: {e}")
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+def format_tenant_summary(results, seconds):
+    """테넌트별 결과를 한 메시지로 요약"""
+    ok = sum(r["ok"] for r in results)
+    lines = [f"📋 [daily_check] 테넌트 {len(results)}곳 중 {ok}곳 완료 ({seconds:.1f}초)"]
+    for r in results:
+        if not r["ok"]:
+            lines.append(f"- ❗ {r['tenant']}: 오류 — {r['error']} ({r['seconds']:.1f}초)")
+            continue
+        s = r["stats"]
+        line = f"- ✅ {r['tenant']}: 메일 {s['emailed']}, 연장 {s['extended']}, 삭제 {s['dropped']}"
+        if s["deferred"]:
+            line += f", 한도 초과 {s['deferred']}"
+        if s["email_failed"]:
+            line += f", 발송 실패 {s['email_failed']}"
+        lines.append(f"{line} ({r['seconds']:.1f}초)")
+    return "\n".join(lines)
+
+def daily_check(tenants=None):
     """
+    모든 테넌트(tenants.json, 없으면 SPREADSHEET_ID 하나)의 daily_check를 실행합니다.
+    테넌트가 여럿이면 TENANT_WORKERS개 스레드에서 동시에 돌려, 전체 시간이 합계가 아니라
+    가장 느린 테넌트 수준이 되게 하고 마지막에 테넌트별 결과 요약을 보냅니다.
+    이미 실행 중이면 겹쳐 돌지 않고 False를 반환합니다.
+    """
+    if not _run_lock.acquire(blocking=False):
+        logging.warning("[daily_check] 이미 실행 중 — 이번 요청은 건너뜀")
+        return False
+
     try:
-        send_telegram_message("🚀 [daily_check] 자동화 시작")
-        record_expiring_users()
-        check_payment_and_extend()
-        handle_phone_list_for_sms()
-        send_telegram_message("✅ [daily_check] 전체 프로세스 완료")
-    except Exception as e:
-        send_telegram_message(f"❗ [daily_check] 오류 발생: {e}")
-        logging.error(f"[daily_check] 예외: {e}")
-
-# 매일 아침 08:00에 실행되도록 스케줄 설정
-schedule.every().day.at("09:30").do(daily_check)
+        try:
+            tenants = tenants or load_tenants()
+        except (OSError, ValueError) as e:
+            send_telegram_message(f"❗ [daily_check] 테넌트 설정 오류: {e}")
+            logging.error(f"[daily_check] 테넌트 설정 오류: {e}")
+            return True
+
+        with track("daily.total"):
+            if len(tenants) == 1:
+                send_telegram_message("🚀 [daily_check] 자동화 시작")
+                run_tenant(tenants[0])
+                return True
+
+            send_telegram_message(f"🚀 [daily_check] 자동화 시작 (테넌트 {len(tenants)}곳)")
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, TENANT_WORKERS), thread_name_prefix="tenant") as pool:
+                results = list(pool.map(lambda tenant: run_tenant(tenant, labeled=True), tenants))
+            send_telegram_message(format_tenant_summary(results, time.perf_counter() - started))
+    finally:
+        _run_lock.release()
+    return True
 
 if __name__ == "__main__":
-    # 서버 시작 시 즉시 한 번 실행
-    send_telegram_message("[main] 스케줄러 시작 — 즉시 실행")
+    # 수동 1회 실행 (매일 정기 실행은 bot.py 안의 JobQueue가 담당)
     daily_check()
-
-    # 이후 매 분마다 스케줄 점검
-    send_telegram_message("[main] 루프 진입, 스케줄 대기 중")
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
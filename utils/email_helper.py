@@ -1,14 +1,38 @@
+import base64
 import os
 import logging
+import re
 import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+from email.mime.nonmultipart import MIMENonMultipart
+
+from utils.metrics import track
+from utils.rate_limit import TokenBucket
 
 SMTP_HOST = "smtp.gmail.com"
 SMTP_PORT = 587
 EMAIL_ADDRESS = os.environ.get("EMAIL_ADDRESS")
 EMAIL_PASSWORD = os.environ.get("EMAIL_PASSWORD")
+SMTP_TIMEOUT = 30
+# Gmail은 연결당 메시지 수가 많으면 끊으므로 일정 개수마다 새로 연결
+SMTP_MAX_PER_CONNECTION = int(os.environ.get("SMTP_MAX_PER_CONNECTION", "80"))
+# 계정 하나의 최대 동시 SMTP 연결 수와 초당 발송 한도 (프로세스 전체, 여러 테넌트 합계)
+EMAIL_WORKERS = int(os.environ.get("EMAIL_WORKERS", "3"))
+EMAIL_RATE_PER_SEC = float(os.environ.get("EMAIL_RATE_PER_SEC", "5"))
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+
+# 템플릿별 파일명과 치환 가능한 {{키}} 목록
+PREMIUM_TEMPLATE = ("premium_email.html", ("이름", "만료일", "가입이메일", "입금계좌", "카카오채널링크", "납부기한"))
+FRIEND_TEMPLATE  = ("friends_email.html", ("이름", "가입이메일", "입금계좌", "납부기한"))
+
+_PLACEHOLDER = re.compile(r"\{\{(.*?)\}\}")
+
+class TemplateError(Exception):
+    """템플릿 로드 실패 또는 알 수 없는 {{키}}"""
 
 def load_template(template_path: str) -> str:
     try:
@@ -18,6 +42,49 @@ def load_template(template_path: str) -> str:
         logging.error(f"[load_template] 템플릿 로드 실패: {e}")
         return ""
 
+class EmailTemplate:
+    """
+    한 번만 파싱해 두는 HTML 템플릿.
+    본문을 고정 조각(UTF-8로 미리 인코딩)과 {{키}} 자리로 나눠 두고,
+    render()는 조각과 값을 한 번에 이어 붙여 본문 바이트를 만듭니다.
+    """
+
+    def __init__(self, text, fields, name=""):
+        pieces = _PLACEHOLDER.split(text)
+        self.name = name
+        self.keys = [key.strip() for key in pieces[1::2]]
+        unknown = sorted(set(self.keys) - set(fields))
+        if unknown:
+            raise TemplateError(f"{name}: 알 수 없는 치환 키 {unknown}")
+        self._static = [piece.encode("utf-8") for piece in pieces[0::2]]
+
+    def render(self, values) -> bytes:
+        out = [self._static[0]]
+        for key, static in zip(self.keys, self._static[1:]):
+            out.append(str(values[key]).encode("utf-8"))
+            out.append(static)
+        return b"".join(out)
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+def get_template(spec) -> EmailTemplate:
+    """(파일명, 허용 키) 템플릿을 처음 한 번만 읽고 파싱해 캐시"""
+    filename, fields = spec
+    with _templates_lock:
+        template = _templates.get(filename)
+        if template is None:
+            text = load_template(os.path.join(TEMPLATE_DIR, filename))
+            if not text:
+                raise TemplateError(f"{filename}: 템플릿을 읽을 수 없습니다.")
+            template = _templates[filename] = EmailTemplate(text, fields, filename)
+        return template
+
+def preload_templates():
+    """발송 전에 모든 템플릿을 파싱해 두고, 문제가 있으면 바로 TemplateError"""
+    for spec in (PREMIUM_TEMPLATE, FRIEND_TEMPLATE):
+        get_template(spec)
+
 def get_due_date_str(expire_date: str) -> str:
     """
     만료일(expire_date: "YYYY-MM-DD")을 받아
@@ -34,65 +101,278 @@ def get_due_date_str(expire_date: str) -> str:
         due = datetime.now().date() + timedelta(days=1)
         return f"{due.month}월 {due.day}일 (23시 59분까지)"
 
-def send_premium_email(to_email, name, expire_date, sign_email, deposit_account, kakao_link, due_date):
-    html_body = load_template("templates/premium_email.html")
-    if not html_body:
+class MailerSession:
+    """
+    하나의 인증된 SMTP 연결로 여러 통을 보내는 메일 세션.
+    연결이 끊기면 자동으로 재접속 후 한 번 더 시도하고,
+    수신자별 결과는 results에 (이메일, 성공 여부, 오류) 형태로 쌓입니다.
+
+        with MailerSession() as mailer:
+            send_premium_email(..., mailer=mailer)
+    """
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, user=None, password=None,
+                 max_per_connection=SMTP_MAX_PER_CONNECTION):
+        self.host = host
+        self.port = port
+        self.user = user or EMAIL_ADDRESS
+        self.password = password or EMAIL_PASSWORD
+        self.max_per_connection = max_per_connection
+        self.results = []
+        self._server = None
+        self._sent_on_connection = 0
+        self._auth_error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
         return False
 
-    # 변수 치환
-    html_body = html_body.replace("{{이름}}", name)
-    html_body = html_body.replace("{{만료일}}", expire_date)
-    html_body = html_body.replace("{{가입이메일}}", sign_email)
-    html_body = html_body.replace("{{입금계좌}}", deposit_account)
-    html_body = html_body.replace("{{카카오채널링크}}", kakao_link)
-    html_body = html_body.replace("{{납부기한}}", due_date)
+    def _connect(self):
+        self.close()
+        with track("email.connect"):
+            server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+            server.starttls()
+            server.login(self.user, self.password)
+        self._server = server
+        self._sent_on_connection = 0
+        logging.info("[MailerSession] SMTP 연결/로그인 완료")
 
-    subject = f"[플랫플릭스] 구독 만료 안내 - {name}님"
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+    def send(self, to_email, msg) -> bool:
+        """메시지 한 통 전송. 연결이 끊겼으면 재접속 후 1회 재시도"""
+        with track("email.send") as t:
+            ok = self._send(to_email, msg)
+            if not ok:
+                t.fail()
+        return ok
+
+    def _send(self, to_email, msg) -> bool:
+        if self._auth_error is not None:
+            # 로그인 실패 후 같은 계정으로 반복 로그인하지 않음
+            self.results.append((to_email, False, str(self._auth_error)))
+            return False
+
+        error = None
+        for attempt in range(2):
+            try:
+                if self._server is None or self._sent_on_connection >= self.max_per_connection:
+                    self._connect()
+                self._server.sendmail(self.user, to_email, msg.as_string())
+                self._sent_on_connection += 1
+                self.results.append((to_email, True, None))
+                return True
+            except smtplib.SMTPAuthenticationError as e:
+                error = self._auth_error = e
+                break
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError) as e:
+                # 연결 문제 → 새 연결로 한 번만 재시도
+                error = e
+                self._server = None
+                logging.warning(f"[MailerSession] 연결 끊김, 재접속 시도 ({attempt + 1}/2): {e}")
+            except smtplib.SMTPException as e:
+                # 수신 거부 등 수신자 단위 실패는 재시도하지 않음
+                error = e
+                break
+            except OSError as e:
+                # 소켓 오류(타임아웃 등)도 연결 문제로 보고 재접속
+                error = e
+                self._server = None
+                logging.warning(f"[MailerSession] 소켓 오류, 재접속 시도 ({attempt + 1}/2): {e}")
+        logging.error(f"[MailerSession] 전송 실패 → {to_email}, 오류: {error}")
+        self.results.append((to_email, False, str(error)))
+        return False
+
+    def failures(self):
+        return [(email, err) for email, ok, err in self.results if not ok]
+
+class MailerPool:
+    """
+    SMTP 계정 하나를 프로세스 전체가 나눠 쓰는 연결 풀 + 발송 속도 제한.
+    여러 테넌트가 동시에 보내도 같은 계정의 SMTP 연결은 최대 EMAIL_WORKERS개,
+    발송 속도는 합쳐서 초당 EMAIL_RATE_PER_SEC통을 넘지 않습니다.
+    사용 중인 EmailDispatcher가 모두 끝나면 연결을 닫습니다.
+    """
+
+    def __init__(self, user=None, connections=None, rate_per_sec=None):
+        self.user = user or EMAIL_ADDRESS
+        self.limiter = TokenBucket(EMAIL_RATE_PER_SEC if rate_per_sec is None else rate_per_sec)
+        self._slots = threading.BoundedSemaphore(max(1, connections or EMAIL_WORKERS))
+        self._lock = threading.Lock()
+        self._idle = []
+        self._users = 0
+
+    def begin(self):
+        with self._lock:
+            self._users += 1
 
+    def end(self):
+        """마지막 사용자가 끝나면 남은 연결을 닫음 (다음 실행은 새 연결/새 로그인으로 시작)"""
+        with self._lock:
+            self._users -= 1
+            if self._users:
+                return
+            idle, self._idle = self._idle, []
+        for mailer in idle:
+            mailer.close()
+
+    def checkout(self) -> "MailerSession":
+        """빈 연결이 생길 때까지 기다렸다가 하나를 빌림 (없으면 새로 만듦)"""
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return MailerSession(user=self.user)
+
+    def checkin(self, mailer):
+        with self._lock:
+            self._idle.append(mailer)
+        self._slots.release()
+
+# SMTP 계정 → 풀 (프로세스 전역)
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_mailer_pool(user=None) -> MailerPool:
+    """계정(기본 EMAIL_ADDRESS)의 프로세스 전역 MailerPool"""
+    user = user or EMAIL_ADDRESS
+    with _pools_lock:
+        pool = _pools.get(user)
+        if pool is None:
+            pool = _pools[user] = MailerPool(user)
+        return pool
+
+class EmailDispatcher:
+    """
+    여러 워커가 메일을 나눠 발송하는 파이프라인.
+    연결과 발송 속도는 계정 단위 MailerPool을 다른 테넌트와 함께 쓰고,
+    workers/rate_per_sec는 그 안에서 이 발송만의 상한입니다. (rate_per_sec가 None이면 계정 한도만 적용)
+
+        dispatcher = EmailDispatcher()
+        for key, ok in dispatcher.run([(key, functools.partial(send_xxx, ...)), ...]):
+            ...
+    """
+
+    def __init__(self, workers=None, rate_per_sec=None, pool=None):
+        self.workers = max(1, workers or EMAIL_WORKERS)
+        self.limiter = TokenBucket(rate_per_sec) if rate_per_sec is not None else None
+        self.pool = pool or get_mailer_pool()
+        self._failures = []
+        self._failures_lock = threading.Lock()
+
+    def _run_one(self, job):
+        key, send_fn = job
+        if self.limiter is not None:
+            self.limiter.acquire()
+        self.pool.limiter.acquire()
+        mailer = self.pool.checkout()
+        start = len(mailer.results)
+        try:
+            return key, bool(send_fn(mailer=mailer))
+        except Exception as e:
+            logging.error(f"[EmailDispatcher] 작업 실패 ({key}): {e}")
+            return key, False
+        finally:
+            # 연결은 다른 발송과 같이 쓰므로 이번 작업의 결과만 떼어 옴
+            results = mailer.results[start:]
+            del mailer.results[start:]
+            self.pool.checkin(mailer)
+            failed = [(email, err) for email, ok, err in results if not ok]
+            if failed:
+                with self._failures_lock:
+                    self._failures.extend(failed)
+
+    def run(self, jobs):
+        """
+        (key, send_fn) 작업들을 병렬로 처리하며 (key, 성공 여부)를 완료되는 순서대로 내보냄.
+        send_fn은 mailer= 키워드로 풀에서 빌린 MailerSession을 받습니다.
+        """
+        self.pool.begin()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mailer") as pool:
+                futures = [pool.submit(self._run_one, job) for job in jobs]
+                for future in as_completed(futures):
+                    yield future.result()
+        finally:
+            self.pool.end()
+
+    def failures(self):
+        with self._failures_lock:
+            return list(self._failures)
+
+def _deliver(to_email, msg, mailer=None) -> bool:
+    """mailer가 있으면 기존 연결로, 없으면 일회성 세션으로 전송"""
+    if mailer is not None:
+        return mailer.send(to_email, msg)
+    with MailerSession() as session:
+        return session.send(to_email, msg)
+
+def _build_message(subject, to_email, html_bytes):
     msg = MIMEMultipart("alternative")
     msg["Subject"] = subject
     msg["From"] = EMAIL_ADDRESS
     msg["To"] = to_email
-    msg.attach(MIMEText(html_body, "html", _charset="utf-8"))
+    # 이미 UTF-8 바이트로 렌더링된 본문을 그대로 base64로 실음
+    part = MIMENonMultipart("text", "html", charset="utf-8")
+    part["Content-Transfer-Encoding"] = "base64"
+    part.set_payload(base64.encodebytes(html_bytes).decode("ascii"))
+    msg.attach(part)
+    return msg
 
+def send_premium_email(to_email, name, expire_date, sign_email, deposit_account, kakao_link, due_date, mailer=None):
     try:
-        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-        server.starttls()
-        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-        server.sendmail(EMAIL_ADDRESS, to_email, msg.as_string())
-        server.quit()
+        template = get_template(PREMIUM_TEMPLATE)
+    except TemplateError as e:
+        logging.error(f"[이메일] {e}")
+        return False
+
+    html_bytes = template.render({
+        "이름": name,
+        "만료일": expire_date,
+        "가입이메일": sign_email,
+        "입금계좌": deposit_account,
+        "카카오채널링크": kakao_link,
+        "납부기한": due_date,
+    })
+
+    subject = f"[플랫플릭스] 구독 만료 안내 - {name}님"
+    msg = _build_message(subject, to_email, html_bytes)
+
+    if _deliver(to_email, msg, mailer):
         logging.info(f"[이메일] 전송 성공 → {to_email}")
         return True
-    except Exception as e:
-        logging.error(f"[이메일] 전송 실패 → {to_email}, 오류: {e}")
-        return False
+    logging.error(f"[이메일] 전송 실패 → {to_email}")
+    return False
 
-def send_friend_email(to_email, name, sign_email, deposit_account, due_date):
-    html_body = load_template("templates/friends_email.html")
-    if not html_body:
+def send_friend_email(to_email, name, sign_email, deposit_account, due_date, mailer=None):
+    try:
+        template = get_template(FRIEND_TEMPLATE)
+    except TemplateError as e:
+        logging.error(f"[이메일] {e}")
         return False
 
-    html_body = html_body.replace("{{이름}}", name)
-    html_body = html_body.replace("{{가입이메일}}", sign_email)
-    html_body = html_body.replace("{{입금계좌}}", deposit_account)
-    html_body = html_body.replace("{{납부기한}}", due_date)
+    html_bytes = template.render({
+        "이름": name,
+        "가입이메일": sign_email,
+        "입금계좌": deposit_account,
+        "납부기한": due_date,
+    })
 
     subject = f"[플랫플릭스] {name}님, 이번 달 요금 안내드립니다 😊"
+    msg = _build_message(subject, to_email, html_bytes)
 
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = EMAIL_ADDRESS
-    msg["To"] = to_email
-    msg.attach(MIMEText(html_body, "html", _charset="utf-8"))
-
-    try:
-        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-        server.starttls()
-        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-        server.sendmail(EMAIL_ADDRESS, to_email, msg.as_string())
-        server.quit()
+    if _deliver(to_email, msg, mailer):
         logging.info(f"[이메일] 지인용 전송 성공 → {to_email}")
         return True
-    except Exception as e:
-        logging.error(f"[이메일] 지인용 전송 실패 → {to_email}, 오류: {e}")
-        return False
+    logging.error(f"[이메일] 지인용 전송 실패 → {to_email}")
+    return False
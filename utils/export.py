@@ -0,0 +1,109 @@
+import csv
+import logging
+import os
+import re
+import tempfile
+from datetime import datetime
+
+from utils.lazy import lazy_import
+from utils.metrics import track
+from utils.telegram_helper import send_telegram_document
+from utils.user_store import format_phone
+
+# 봇 시작 경로에서 빼기 위해 첫 xlsx 내보내기 때 불러옴
+openpyxl = lazy_import("openpyxl")
+
+# 기본 파일 형식 (csv 또는 xlsx). xlsx는 lxml이 없으면 행 쓰기가 csv보다 수십 배 느려 기본은 csv
+EXPORT_FORMAT = os.environ.get("EXPORT_FORMAT", "csv").lower()
+EXPORT_FORMATS = ("csv", "xlsx")
+# 임시 파일을 만들 디렉터리 (비우면 시스템 임시 디렉터리)
+EXPORT_DIR = os.environ.get("EXPORT_DIR") or None
+
+# xlsx에 넣을 수 없는 제어 문자 (openpyxl의 IllegalCharacterError 방지)
+_ILLEGAL_XLSX = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _write_csv(path, header, rows):
+    count = 0
+    # 엑셀에서 한글이 깨지지 않도록 BOM 포함 UTF-8
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+def _xlsx_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return _ILLEGAL_XLSX.sub("", value)
+    return value
+
+def _write_xlsx(path, header, rows, title):
+    # write-only 모드: 행을 바로 임시 XML로 흘려 보내므로 행 수와 상관없이 메모리 일정
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.append(list(header))
+    count = 0
+    for row in rows:
+        sheet.append([_xlsx_cell(value) for value in row])
+        count += 1
+    workbook.save(path)
+    return count
+
+def _blank(value):
+    # None, NaN(자기 자신과 다름), 빈 문자열
+    return value is None or value != value or not str(value).strip()
+
+def phone_rows(pairs):
+    """(이름, 전화번호) → 문자 발송 파일 행. 번호가 빈 행은 건너뛰고 번호는 하이픈 형식으로"""
+    for name, phone in pairs:
+        if _blank(phone):
+            continue
+        yield ["" if _blank(name) else name, format_phone(str(phone))]
+
+def write_export(header, rows, fmt=None, title="data"):
+    """
+    행(iterable)을 하나씩 임시 파일에 써서 (경로, 행 수)를 반환합니다.
+    rows는 제너레이터여도 되고, 전체를 메모리에 모으지 않습니다. 파일 삭제는 호출한 쪽 몫입니다.
+    """
+    fmt = (fmt or EXPORT_FORMAT).lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"지원하지 않는 형식: {fmt} (csv/xlsx)")
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=f".{fmt}", dir=EXPORT_DIR)
+    os.close(fd)
+    try:
+        with track(f"export.{fmt}"):
+            if fmt == "csv":
+                count = _write_csv(path, header, rows)
+            else:
+                count = _write_xlsx(path, header, rows, title)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, count
+
+def export_filename(name, fmt=None):
+    """name_YYYYMMDD.형식"""
+    return f"{name}_{datetime.now().strftime('%Y%m%d')}.{(fmt or EXPORT_FORMAT).lower()}"
+
+def send_export(name, header, rows, caption="", fmt=None, chat_id=None):
+    """
+    행을 파일로 내보내 텔레그램 문서로 보냅니다. caption의 {count}는 행 수로 바뀝니다.
+    반환값: 보낸 행 수 (행이 없으면 보내지 않고 0, 전송 실패면 None)
+    """
+    fmt = (fmt or EXPORT_FORMAT).lower()
+    path, count = write_export(header, rows, fmt, title=name)
+    try:
+        if not count:
+            return 0
+        filename = export_filename(name, fmt)
+        caption = caption.format(count=count) if caption else ""
+        if not send_telegram_document(path, filename, caption, chat_id):
+            logging.error(f"[send_export] '{filename}' 전송 실패 ({count}행)")
+            return None
+        logging.info(f"[send_export] '{filename}' 전송 ({count}행, {os.path.getsize(path)} bytes)")
+        return count
+    finally:
+        os.remove(path)
@@ -0,0 +1,139 @@
+import logging
+import os
+import re
+import threading
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+
+from utils.tenant import current_tenant
+from utils.user_index import parse_date
+from utils.user_store import normalize_email
+
+# 그룹(공유 계정) 하나의 정원
+GROUP_CAPACITY = int(os.environ.get("GROUP_CAPACITY", "5"))
+
+# 만료일이 없거나 형식이 틀린 사용자는 목록 맨 뒤 (곧 빌 자리로 치지 않음)
+_NO_EXPIRE = date.max
+
+def group_key(group, group_no):
+    """(그룹, 그룹 번호) 키. 그룹이 비어 있으면 None (그룹에 속하지 않은 사용자)"""
+    group = str(group or "").strip()
+    if not group:
+        return None
+    return group, str(group_no if group_no is not None else "").strip()
+
+def _natural(text):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", text)]
+
+def _sort_key(key):
+    # 숫자 부분은 숫자 순 (admin2가 admin10보다, 2번이 10번보다 앞)
+    group, number = key
+    return _natural(group), _natural(number)
+
+class GroupOccupancy:
+    """
+    (그룹, 그룹 번호)별 인원과 만료일 순 구성원 목록을 메모리에 유지하는 인덱스.
+    - sync(): 스냅샷이 갱신될 때 이전 상태와 다른 사용자만 고쳐 반영
+    - apply(): daily_check의 연장/삭제 결과를 해당 사용자만 고쳐 반영
+    조회는 전체를 다시 집계하지 않고 그룹별로 유지된 값만 읽습니다.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or GROUP_CAPACITY
+        self._lock = threading.Lock()
+        # 이메일 키 → [(그룹 키, 만료일, 이름), ...] (같은 이메일이 여러 행일 수 있음)
+        self._members = {}
+        # 그룹 키 → 만료일 순 [(만료일, 이메일 키, 이름), ...]
+        self._groups = {}
+
+    # ------------------------------------------------------------ 갱신
+
+    def _add(self, email, entries):
+        self._members[email] = entries
+        for key, expire, name in entries:
+            insort(self._groups.setdefault(key, []), (expire, email, name))
+
+    def _remove(self, email):
+        for key, expire, name in self._members.pop(email, ()):
+            members = self._groups[key]
+            del members[bisect_left(members, (expire, email, name))]
+
+    @staticmethod
+    def _entries(records):
+        """UserRecord 목록 → {이메일 키: [(그룹 키, 만료일, 이름), ...]}"""
+        result = {}
+        for record in records:
+            key = group_key(record.group, record.group_no)
+            if key is None:
+                continue
+            expire = parse_date(record.expire) or _NO_EXPIRE
+            result.setdefault(normalize_email(record.email), []).append((key, expire, str(record.name or "")))
+        return result
+
+    def sync(self, records):
+        """스냅샷(UserRecord 목록)과 맞춰 바뀐 사용자만 반영하고, 반영한 사용자 수를 반환"""
+        current = self._entries(records)
+        changed = 0
+        with self._lock:
+            for email in [email for email in self._members if email not in current]:
+                self._remove(email)
+                changed += 1
+            for email, entries in current.items():
+                if self._members.get(email) == entries:
+                    continue
+                self._remove(email)
+                self._add(email, entries)
+                changed += 1
+        if changed:
+            logging.info(f"[GroupOccupancy] {changed}명 반영 (그룹 {len(self._groups)}개)")
+        return changed
+
+    def apply(self, expires=None, dropped=()):
+        """
+        연장/삭제 결과 반영. expires={이메일: 새 만료일}, dropped=[이메일, ...]
+        인덱스에 없는 이메일은 건너뜁니다. (다음 sync에서 맞춰짐)
+        """
+        with self._lock:
+            for email in dropped:
+                self._remove(normalize_email(email))
+            for email, expire in (expires or {}).items():
+                email = normalize_email(email)
+                entries = self._members.get(email)
+                if not entries:
+                    continue
+                expire = parse_date(expire) or _NO_EXPIRE
+                self._remove(email)
+                self._add(email, [(key, expire, name) for key, _, name in entries])
+
+    # ------------------------------------------------------------ 조회
+
+    def summary(self, today, days):
+        """
+        그룹별 [(그룹 키, 인원, 빈자리, 곧 빌 자리 [(만료일, 이름), ...])] (그룹 순).
+        곧 빌 자리 = 만료일이 today + days 이하인 구성원 (이미 만료되어 삭제 대기 중인 사람 포함)
+        """
+        until = today + timedelta(days=days)
+        result = []
+        with self._lock:
+            for key in sorted(self._groups, key=_sort_key):
+                members = self._groups[key]
+                # 만료일 순이라 앞에서부터 until을 넘는 지점까지만
+                soon = members[:bisect_left(members, (until + timedelta(days=1),))]
+                result.append((
+                    key, len(members), max(0, self.capacity - len(members)),
+                    [(expire, name) for expire, _, name in soon],
+                ))
+        return result
+
+# 테넌트 이름 → 인덱스 (봇은 기본 테넌트만 씀)
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_occupancy() -> GroupOccupancy:
+    """현재 테넌트의 그룹 인원 인덱스"""
+    tenant = current_tenant()
+    with _indexes_lock:
+        index = _indexes.get(tenant.name)
+        if index is None:
+            index = _indexes[tenant.name] = GroupOccupancy()
+        return index
@@ -0,0 +1,87 @@
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from utils.tenant import current_tenant
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOURNAL_PATH = os.environ.get("DAILY_JOURNAL_PATH", os.path.join(ROOT, "daily_journal.sqlite3"))
+# 이 기간보다 오래된 기록은 열 때 정리
+JOURNAL_KEEP_DAYS = int(os.environ.get("DAILY_JOURNAL_KEEP_DAYS", "60"))
+
+class Journal:
+    """
+    daily_check 작업 단계를 사용자(작업 키)별로 남기는 로컬 SQLite 저널.
+    외부 부수효과(메일 발송, 시트 반영)가 끝난 직후 mark()로 기록해 두고,
+    재실행 시 done()/completed()로 이미 끝난 단계를 건너뜁니다.
+    """
+
+    def __init__(self, path=None):
+        # 테넌트마다 별도 파일 (기본 테넌트는 JOURNAL_PATH 그대로)
+        self.path = path or current_tenant().path_for(JOURNAL_PATH)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS steps ("
+            " item TEXT NOT NULL, step TEXT NOT NULL, detail TEXT, created_at TEXT NOT NULL,"
+            " PRIMARY KEY (item, step))"
+        )
+        self.prune(JOURNAL_KEEP_DAYS)
+
+    def mark(self, item, step, detail=""):
+        self.mark_many([(item, step, detail)])
+
+    def mark_many(self, entries):
+        """(작업 키, 단계, 설명) 목록을 한 트랜잭션으로 기록"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [(item, step, detail, now) for item, step, detail in entries]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+
+    def done(self, item, step) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM steps WHERE item = ? AND step = ?", (item, step)
+            ).fetchone()
+        return row is not None
+
+    def completed(self, step):
+        """해당 단계가 끝난 작업 키 전체 (대량 조회용)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT item FROM steps WHERE step = ?", (step,)).fetchall()
+        return {item for (item,) in rows}
+
+    def prune(self, keep_days):
+        cutoff = (datetime.now() - timedelta(days=keep_days)).strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM steps WHERE created_at < ?", (cutoff,)).rowcount
+        if deleted:
+            logging.info(f"[Journal] 오래된 기록 {deleted}건 정리")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# 테넌트 이름 → 저널 (테넌트마다 별도 파일, 실행마다 새로 열지 않고 연결 하나를 계속 씀)
+_journals = {}
+_journals_lock = threading.Lock()
+
+def get_journal() -> Journal:
+    """현재 테넌트의 저널. 이미 열려 있으면 가져올 때(실행 1회당 한 번 꼴) 오래된 기록을 정리"""
+    tenant = current_tenant()
+    with _journals_lock:
+        journal = _journals.get(tenant.name)
+        if journal is None:
+            # 새로 열 때는 __init__에서 정리
+            journal = _journals[tenant.name] = Journal(tenant.path_for(JOURNAL_PATH))
+            return journal
+    journal.prune(JOURNAL_KEEP_DAYS)
+    return journal
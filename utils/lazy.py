@@ -0,0 +1,23 @@
+import importlib
+import sys
+import types
+
+class LazyModule(types.ModuleType):
+    """
+    처음 속성에 접근할 때 실제 모듈을 import하고, 이후 접근은 그 모듈로 넘기는 대리 객체.
+    동시에 처음 접근해도 import 잠금이 한 번만 실행되도록 보장합니다.
+    """
+
+    def __getattr__(self, attr):
+        module = self.__dict__.get("_module")
+        if module is None:
+            module = self.__dict__["_module"] = importlib.import_module(self.__name__)
+        return getattr(module, attr)
+
+def lazy_import(name):
+    """
+    pandas/gspread처럼 무거운 모듈을 봇 시작 경로에서 빼기 위한 지연 import.
+    이미 import된 모듈이면 그대로 돌려줍니다.
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
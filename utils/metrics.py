@@ -0,0 +1,215 @@
+import functools
+import inspect
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+# 계측 on/off. 끄면 timed()는 원래 함수를 그대로 돌려주고 track()은 아무 일도 하지 않음
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+# 백분위 계산에 쓰는 최근 표본 수 (지표별)
+METRICS_SAMPLES = int(os.environ.get("METRICS_SAMPLES", "1024"))
+# Prometheus 히스토그램 버킷 경계(초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class Stat:
+    """지표 하나의 호출 수/오류 수/소요 시간 누적값과 최근 표본"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.samples = deque(maxlen=METRICS_SAMPLES)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        with self._lock:
+            self.count += 1
+            self.errors += error
+            self.total += seconds
+            self.buckets[bisect_left(BUCKETS, seconds)] += 1
+            self.samples.append(seconds)
+
+    def percentile(self, q):
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return 0.0
+        # nearest-rank 방식
+        return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+_stats = {}
+_counters = {}
+_lock = threading.Lock()
+_started_at = time.time()
+
+def _stat(name) -> Stat:
+    stat = _stats.get(name)
+    if stat is None:
+        with _lock:
+            stat = _stats.setdefault(name, Stat())
+    return stat
+
+class _Timer:
+    """track() 블록 안에서 예외 없이 실패를 표시할 때 쓰는 핸들 (반환값으로 실패를 알리는 함수용)"""
+
+    __slots__ = ("failed",)
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+class _Track:
+    __slots__ = ("name", "timer", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.timer = _Timer()
+        self.started = time.perf_counter()
+        return self.timer
+
+    def __exit__(self, exc_type, exc, tb):
+        _stat(self.name).observe(time.perf_counter() - self.started, exc_type is not None or self.timer.failed)
+        return False
+
+class _NullTrack:
+    """계측이 꺼져 있을 때 track()이 돌려주는 빈 컨텍스트 (자기 자신이 타이머 역할)"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def fail(self):
+        pass
+
+_NULL_TRACK = _NullTrack()
+
+def track(name):
+    """
+    with track("sheets.read") as t: ... 블록의 소요 시간을 기록.
+    블록에서 예외가 나오거나 t.fail()을 부르면 오류로 셉니다.
+    """
+    return _Track(name) if METRICS_ENABLED else _NULL_TRACK
+
+def timed(name=None):
+    """함수(동기/비동기) 호출 시간과 예외를 기록하는 데코레이터. 계측이 꺼져 있으면 원래 함수 그대로"""
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+        metric = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _Track(metric):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Track(metric):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, n=1):
+    """단순 카운터 증가 (캐시 적중 등)"""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def snapshot():
+    """{지표: {count, errors, error_rate, avg, p50, p95, max}}, {카운터: 값}"""
+    with _lock:
+        stats = dict(_stats)
+        counters = dict(_counters)
+    result = {}
+    for name, stat in sorted(stats.items()):
+        if not stat.count:
+            continue
+        result[name] = {
+            "count": stat.count,
+            "errors": stat.errors,
+            "error_rate": stat.errors / stat.count,
+            "avg": stat.total / stat.count,
+            "p50": stat.percentile(0.50),
+            "p95": stat.percentile(0.95),
+            "max": max(stat.samples, default=0.0),
+        }
+    return result, dict(sorted(counters.items()))
+
+def reset():
+    global _started_at
+    with _lock:
+        _stats.clear()
+        _counters.clear()
+        _started_at = time.time()
+
+def _ms(seconds):
+    return f"{seconds * 1000:.0f}ms" if seconds < 10 else f"{seconds:.1f}s"
+
+def format_summary():
+    """.통계 명령어용 요약 (지표별 호출 수, 오류율, p50/p95)"""
+    if not METRICS_ENABLED:
+        return "📊 계측이 꺼져 있습니다. (METRICS_ENABLED=1로 켜기)"
+    stats, counters = snapshot()
+    minutes = int((time.time() - _started_at) // 60)
+    lines = [f"📊 통계 (최근 {minutes}분)"]
+    if not stats and not counters:
+        lines.append("아직 기록된 호출이 없습니다.")
+    for name, s in stats.items():
+        line = f"• {name}: {s['count']}회, p50 {_ms(s['p50'])}, p95 {_ms(s['p95'])}"
+        if s["errors"]:
+            line += f", 오류 {s['errors']}회({s['error_rate']:.0%})"
+        lines.append(line)
+    for name, value in counters.items():
+        lines.append(f"• {name}: {value}")
+    return "\n".join(lines)
+
+def _prom_name(name):
+    return "platflix_" + "".join(c if c.isalnum() else "_" for c in name)
+
+def prometheus_text():
+    """Prometheus 텍스트 형식(0.0.4)으로 모든 지표를 출력"""
+    with _lock:
+        stats = sorted(_stats.items())
+        counters = sorted(_counters.items())
+    lines = []
+    for name, stat in stats:
+        metric = _prom_name(name)
+        with stat._lock:
+            buckets, total, n, errors = list(stat.buckets), stat.total, stat.count, stat.errors
+        lines.append(f"# TYPE {metric}_seconds histogram")
+        cumulative = 0
+        for bound, hits in zip(BUCKETS, buckets):
+            cumulative += hits
+            lines.append(f'{metric}_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_seconds_bucket{{le="+Inf"}} {n}')
+        lines.append(f"{metric}_seconds_sum {total:.6f}")
+        lines.append(f"{metric}_seconds_count {n}")
+        lines.append(f"# TYPE {metric}_errors_total counter")
+        lines.append(f"{metric}_errors_total {errors}")
+    for name, value in counters:
+        metric = _prom_name(name)
+        lines.append(f"# TYPE {metric}_total counter")
+        lines.append(f"{metric}_total {value}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path):
+    """node_exporter textfile 수집기 등에서 읽도록 파일로 저장 (임시 파일 후 교체)"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
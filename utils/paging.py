@@ -0,0 +1,111 @@
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+# 한 페이지에 보여 줄 항목 수, 결과 보관 시간(초)과 최대 보관 개수
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", "20"))
+RESULT_TTL = int(os.environ.get("PAGE_RESULT_TTL", "600"))
+MAX_RESULTS = 100
+# 텔레그램 메시지 최대 길이 (UTF-16 코드 단위)
+MAX_MESSAGE_LENGTH = 4096
+
+def message_length(text):
+    """텔레그램이 세는 방식(UTF-16 코드 단위)의 메시지 길이"""
+    return len(text.encode("utf-16-le")) // 2
+
+class PagedResult:
+    """
+    조회 결과를 페이지 단위로 나눠 보여 주기 위한 보관 객체.
+    items는 (그룹 제목, 항목) 목록이고, 포맷은 요청된 페이지의 항목만 그때그때 합니다.
+    unit은 쪽 번호 옆 총개수의 단위입니다.
+    항목 길이가 들쭉날쭉하면 fit_length=True로 만들어, 미리 전체를 포맷해
+    렌더링 길이가 메시지 한도를 넘지 않도록 쪽을 나눕니다.
+    """
+
+    def __init__(self, title, items, formatter, page_size=PAGE_SIZE, unit="명", fit_length=False):
+        self.title = title
+        self.items = items
+        self.formatter = formatter
+        self.page_size = max(1, page_size)
+        self.unit = unit
+        self.created_at = time.monotonic()
+        if fit_length:
+            self.starts = self._fit_starts()
+        else:
+            self.starts = list(range(0, len(items), self.page_size)) or [0]
+
+    def _fit_starts(self):
+        # 제목과 쪽 번호 줄 몫을 빼고 남은 길이 안에서 항목을 채움
+        budget = MAX_MESSAGE_LENGTH - 64
+        if self.title:
+            budget -= message_length(self.title) + 2
+        starts = [0]
+        used = count = 0
+        prev_group = None
+        for i, (group, user) in enumerate(self.items):
+            size = message_length(self.formatter(user)) + 2
+            header = message_length(group) + 2 if group else 0
+            if count and (count >= self.page_size or used + size + (header if group != prev_group else 0) > budget):
+                # 새 쪽은 그룹 제목부터 다시 보여 줌
+                starts.append(i)
+                used = count = 0
+                prev_group = None
+            if group and group != prev_group:
+                size += header
+            used += size
+            count += 1
+            prev_group = group
+        return starts
+
+    @property
+    def pages(self):
+        return len(self.starts)
+
+    def render(self, page):
+        page = min(max(page, 0), self.pages - 1)
+        start = self.starts[page]
+        end = self.starts[page + 1] if page + 1 < self.pages else len(self.items)
+        lines = [self.title] if self.title else []
+        prev_group = None
+        for group, user in self.items[start:end]:
+            if group and group != prev_group:
+                lines.append(group)
+                prev_group = group
+            lines.append(self.formatter(user))
+        if self.pages > 1:
+            lines.append(f"📄 {page + 1}/{self.pages} · 총 {len(self.items)}{self.unit}")
+        text = "\n\n".join(lines)
+        if message_length(text) > MAX_MESSAGE_LENGTH:
+            # 항목 하나가 한도를 넘는 경우에도 전송은 되도록 자름
+            text = text.encode("utf-16-le")[:(MAX_MESSAGE_LENGTH - 1) * 2].decode("utf-16-le", "ignore") + "…"
+        return text
+
+_results = OrderedDict()
+_lock = threading.Lock()
+
+def store_result(result: PagedResult) -> str:
+    """결과를 보관하고 콜백 데이터에 넣을 짧은 id를 반환 (오래된 결과부터 정리)"""
+    with _lock:
+        now = time.monotonic()
+        while _results:
+            oldest_id, oldest = next(iter(_results.items()))
+            if len(_results) < MAX_RESULTS and now - oldest.created_at < RESULT_TTL:
+                break
+            del _results[oldest_id]
+        # 재시작 후에도 예전 버튼이 다른 결과를 가리키지 않도록 무작위 id 사용
+        result_id = secrets.token_hex(8)
+        while result_id in _results:
+            result_id = secrets.token_hex(8)
+        _results[result_id] = result
+        return result_id
+
+def get_result(result_id):
+    """보관 중인 결과. 만료되었거나 없으면 None"""
+    with _lock:
+        result = _results.get(result_id)
+        if result is None or time.monotonic() - result.created_at >= RESULT_TTL:
+            _results.pop(result_id, None)
+            return None
+        return result
@@ -1,58 +1,179 @@
+import functools
 import logging
+import os
 from datetime import datetime, timedelta
 
-from utils.sheet_helper import get_sheet_df, append_row, update_sheet_df
+import pandas as pd
+
+from utils.replica import read_sheet_df, write_sheet_df, append_sheet_rows
+from utils.sheet_helper import fetch_sheet_columns
 from utils.telegram_helper import send_telegram_message
-from utils.email_helper import send_premium_email, send_friend_email, get_due_date_str
-
-def format_phone(num: str) -> str:
-    """숫자만 골라 11자리면 xxx-xxxx-xxxx, 10자리면 xx-xxxx-xxxx"""
-    digits = "".join(filter(str.isdigit, num))
-    if len(digits) == 11:
-        return f"{digits[:3]}-{digits[3:7]}-{digits[7:]}"
-    if len(digits) == 10:
-        return f"{digits[:2]}-{digits[2:6]}-{digits[6:]}"
-    return num
-
-def is_in_extends(df_ext, email):
-    """extends_data에 이미 해당 이메일이 기록되어 있는지 검사"""
-    if "이메일" not in df_ext.columns:
-        return False
-    return not df_ext[df_ext["이메일"] == email].empty
-
-def record_expiring_users():
+from utils.journal import get_journal
+from utils.group_index import get_occupancy
+from utils.metrics import timed
+from utils.tenant import current_tenant
+from utils.user_index import parse_date
+from utils.user_store import UserStore, format_phone
+from utils.export import send_export, phone_rows
+from utils.email_helper import (
+    send_premium_email, send_friend_email, get_due_date_str, EmailDispatcher, preload_templates
+)
+
+def is_in_extends(extends: UserStore, email):
+    """extends_data에 이미 해당 이메일이 기록되어 있는지 검사 (UserStore 이메일 키로 O(1))"""
+    return email in extends
+
+def _text_col(df, col):
+    """열을 앞뒤 공백 제거한 문자열 Series로 (열이 없으면 빈 문자열)"""
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].fillna("").astype(str).str.strip()
+
+def _date_col(df, col, fmt="%Y-%m-%d"):
+    """열을 datetime Series로 변환 (빈칸/형식 오류는 NaT)"""
+    return pd.to_datetime(_text_col(df, col), format=fmt, errors="coerce")
+
+# daily_check가 시트를 읽을 때 허용하는 로컬 사본의 나이(초). 0이면 항상 읽기 직전에 동기화
+DAILY_READ_MAX_AGE = float(os.environ.get("DAILY_READ_MAX_AGE", "0"))
+
+# 문자 발송 대상이 이 인원 이하면 파일과 함께 복사용 번호 목록 메시지도 보냄
+SMS_INLINE_MAX = int(os.environ.get("SMS_INLINE_MAX", "50"))
+
+# 발송 한도 초과 알림에 이름을 나열할 최대 인원
+DEFERRED_LIST_LIMIT = 20
+
+# 저널 단계 → 그 단계가 끝났다고 볼 수 있는 user_data 반영 단계 (update_sheet_df의 UpdateReport)
+_STEP_PHASES = {"extended": "cells", "dropped": "deleted"}
+
+# record_expiring_users가 extends_data에 기록하는 열 순서
+EXTENDS_COLUMNS = [
+    "이름", "이메일", "만료일", "전화번호", "비고", "그룹", "그룹 번호",
+    "결제 여부", "지인 여부", "연장 개월수", "입금 여부", "기록 시간",
+]
+
+class DailyRun:
+    """
+    daily_check 한 번의 실행 단위.
+    user_data/extends_data를 처음에 한 번만 읽어 두고 모든 단계가 같은 메모리 상태를 이어서 쓰며,
+    변경 사항은 commit()에서 한꺼번에 시트에 반영합니다.
+    journal에는 끝난 단계를 사용자별로 남겨, 중간에 죽은 뒤 다시 돌려도 같은 일을 두 번 하지 않습니다.
+    """
+
+    def __init__(self, journal=None):
+        # user_data 반영이 성공한 뒤에야 저널에 남길 단계들 (연장/삭제)
+        self.pending_marks = []
+        # 실행 결과 집계 (여러 테넌트를 돌릴 때 요약 알림용)
+        self.stats = {"emailed": 0, "resumed": 0, "deferred": 0, "email_failed": 0, "extended": 0, "dropped": 0}
+        # user_data 반영 후 그룹 인원 인덱스에 넘길 변경 (이메일 → 새 만료일, 삭제된 이메일)
+        self.new_expires = {}
+        self.dropped_emails = []
+        # 차분 반영의 기준이 되므로 동기화에 실패하면 오래된 사본 대신 빈 DataFrame이 옴
+        # → 열이 없으면 메일 발송/시트 반영 전에 이번 실행을 중단 (빈 상태로 처리하거나 덮어쓰지 않도록)
+        self.df_main   = read_sheet_df("user_data", DAILY_READ_MAX_AGE, stale_ok=False)
+        self.df_ext    = read_sheet_df("extends_data", DAILY_READ_MAX_AGE, stale_ok=False)
+        unread = [name for name, df in (("user_data", self.df_main), ("extends_data", self.df_ext))
+                  if not len(df.columns)]
+        if unread:
+            raise RuntimeError(f"{', '.join(unread)} 시트를 읽지 못해 이번 실행을 중단합니다.")
+        self.journal   = journal if journal is not None else get_journal()
+        self.orig_main = self.df_main.copy()
+        self.orig_ext  = self.df_ext.copy()
+        self._next_ext_label = len(self.orig_ext)
+
+    def add_extends_rows(self, rows):
+        """extends_data에 새 행 추가 (시트 반영은 commit 때)"""
+        if not rows:
+            return
+        labels = range(self._next_ext_label, self._next_ext_label + len(rows))
+        self._next_ext_label += len(rows)
+        new = pd.DataFrame(rows, columns=EXTENDS_COLUMNS, index=labels)
+        if len(self.df_ext.columns):
+            new = new.reindex(columns=self.df_ext.columns, fill_value="")
+        self.df_ext = pd.concat([self.df_ext, new]) if len(self.df_ext) else new
+
+    @timed("daily.commit")
+    def commit(self):
+        """
+        바뀐 셀/삭제된 행은 diff로, 새 행은 append_rows로 반영하고 기록 실패 행을 알립니다.
+        """
+        main = write_sheet_df("user_data", self.df_main, original=self.orig_main)
+        # 단계별로 반영된 만큼만 저널/인덱스에 남김 — 셀 수정(연장)만 되고 행 삭제가 실패해도
+        # 연장은 기록되어 다음 실행에서 같은 입금을 다시 연장하지 않음
+        applied, pending = [], []
+        for mark in self.pending_marks:
+            (applied if main.done(_STEP_PHASES[mark[1]]) else pending).append(mark)
+        self.journal.mark_many(applied)
+        self.pending_marks = pending
+        get_occupancy().apply(
+            self.new_expires if main.done("cells") else None,
+            self.dropped_emails if main.done("deleted") else (),
+        )
+        self.new_expires, self.dropped_emails = {}, []
+
+        added = ~self.df_ext.index.isin(self.orig_ext.index)
+        if main.ok:
+            kept = self.df_ext.loc[~added, list(self.orig_ext.columns)]
+            write_sheet_df("extends_data", kept, original=self.orig_ext)
+        else:
+            # 연장/삭제가 user_data에 반영되지 않았으면 extends_data 행을 지우지 않고 다음 실행에서 재처리
+            send_telegram_message("[check] ⚠️ user_data 반영 실패 — extends_data 처리 내역은 다음 실행에서 재시도합니다.")
+
+        report = append_sheet_rows("extends_data", self.df_ext[added].astype(object).values.tolist())
+        # 메일은 나갔지만 extends_data 기록에 실패한 행은 따로 알려 수동 보정
+        if report.failed:
+            msg = "[record] ⚠️ extends_data 기록 실패 (메일은 발송됨):\n" + "\n".join(
+                f"- {row[0]} / {row[1]} ({err})" for row, err in report.failed
+            )
+            send_telegram_message(msg)
+        return report
+
+@timed("daily.record_expiring_users")
+def record_expiring_users(run=None):
     """
     1) user_data에서 이미 만료되었거나 만료 3일 전 대상 찾기
     2) 이메일 발송 → extends_data에 기록 (연장 개월수/입금 여부는 빈칸으로 남겨 두고, 나중에 수작업 입력)
     3) 처리된 이름을 모아 한 번에 텔레그램에 발송
+    입금 계좌/카카오 링크/발송 한도는 현재 테넌트 설정을 따릅니다.
+    run(DailyRun)을 주면 그 상태를 이어서 쓰고, 없으면 직접 읽고 끝에 바로 반영합니다.
     """
-    df_main = get_sheet_df("user_data")
-    df_ext  = get_sheet_df("extends_data")
+    own_run = run is None
+    run     = run or DailyRun()
+    df_main = run.df_main
+    df_ext  = run.df_ext
+    tenant  = current_tenant()
     today   = datetime.now().date()
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    targets = []
-    for i, row in df_main.iterrows():
-        raw_exp = row.get("만료일", "").strip()
-        if not raw_exp:
-            continue
-        exp = datetime.strptime(raw_exp, "%Y-%m-%d").date()
+    # 만료 3일 전 또는 이미 만료된 사용자 (열 단위로 한 번에 계산)
+    today_ts = pd.Timestamp(today)
+    exp      = _date_col(df_main, "만료일")
+    due_mask = (exp <= today_ts) | (exp == today_ts + pd.Timedelta(days=3))
 
-        # 만료 3일 전 또는 이미 만료된 사용자
-        if exp <= today or exp == today + timedelta(days=3):
-            # '지인' + 결제 여부 X(무료)인 경우 건너뛰기
-            if row.get("비고","") == "지인" and row.get("결제 여부","").strip().upper() == "X":
-                continue
-            if not is_in_extends(df_ext, row.get("이메일","")):
-                targets.append(i)
+    # '지인' + 결제 여부 X(무료)인 경우 건너뛰기
+    free_mask = (_text_col(df_main, "비고") == "지인") & (_text_col(df_main, "결제 여부").str.upper() == "X")
+
+    # 이미 extends_data에 기록된 이메일 제외
+    extends   = UserStore.from_frame(df_ext)
+    new_mask  = ~_text_col(df_main, "이메일").map(functools.partial(is_in_extends, extends)).astype(bool)
+
+    targets = df_main[due_mask & ~free_mask & new_mask].to_dict(orient="records")
 
     if not targets:
         send_telegram_message("[record] 대상 없음")
         return
 
-    sent_names = []
-    for idx in targets:
-        u          = df_main.loc[idx]
+    # 템플릿에 문제가 있으면 한 통도 보내기 전에 중단 (TemplateError)
+    preload_templates()
+
+    # 이전 실행에서 메일까지 보냈지만 extends_data 기록 전에 중단된 대상은 재발송하지 않음
+    already_sent = run.journal.completed("email_sent")
+
+    # 발송 작업 목록: (순번, 메일 발송 함수) — 렌더링과 발송은 워커 스레드에서 수행
+    jobs = []
+    rows = []
+    keys = []
+    resumed = []
+    for pos, u in enumerate(targets):
         name       = u["이름"]
         email      = u["이메일"]
         exp_str    = u["만료일"]
@@ -64,57 +185,106 @@ def record_expiring_users():
         friend_f   = u.get("비고", "")  # 비고에 '지인' 표시
         due = get_due_date_str(exp_str)  # 오늘 기준 다음날 23:59까지
 
+        keys.append(f"{email}|{exp_str}")
+        rows.append([
+            name,        # 이름
+            email,       # 이메일
+            exp_str,     # 만료일
+            phone,       # 전화번호
+            remark,      # 비고
+            group,       # 그룹
+            group_no,    # 그룹 번호
+            friend_pay,  # 결제 여부 (user_data 기준)
+            friend_f,    # 지인 여부
+            "",          # 연장 개월수 (수동 입력)
+            "",          # 입금 여부   (수동 입력)
+            now_str      # 기록 시간
+        ])
+        if keys[pos] in already_sent:
+            resumed.append(pos)
+            continue
+
         # 지인 & 결제 안 함(X)이면 친구용, else 정규 템플릿
         if friend_f == "지인" and friend_pay != "X":
-            ok = send_friend_email(
+            send_fn = functools.partial(
+                send_friend_email,
                 to_email=email,
                 name=name,
                 sign_email=u["이메일"],
-                deposit_account="신한은행 110-502-426504",
+                deposit_account=tenant.deposit_account,
                 due_date=due
             )
         else:
-            ok = send_premium_email(
+            send_fn = functools.partial(
+                send_premium_email,
                 to_email=email,
                 name=name,
                 expire_date=exp_str,
                 sign_email=u["이메일"],
-                deposit_account="신한은행 110-502-426504",
-                kakao_link="http://pf.kakao.com/_aXeYK/chat",
+                deposit_account=tenant.deposit_account,
+                kakao_link=tenant.kakao_link,
                 due_date=due
             )
+        jobs.append((pos, send_fn))
+
+    # 테넌트 발송 한도를 넘는 대상은 이번에 보내지 않음 (extends_data에도 기록하지 않으므로 다음 실행에서 다시 대상)
+    deferred = []
+    if tenant.email_quota and len(jobs) > tenant.email_quota:
+        deferred = [pos for pos, _ in jobs[tenant.email_quota:]]
+        jobs = jobs[:tenant.email_quota]
 
+    # 병렬 발송 → 성공할 때마다 저널에 남기고, 성공한 순번만 모아서 마지막에 한 번에 기록
+    dispatcher = EmailDispatcher(workers=tenant.email_workers, rate_per_sec=tenant.email_rate)
+    sent = []
+    for pos, ok in dispatcher.run(jobs):
         if ok:
-            append_row("extends_data", [
-                name,        # 이름
-                email,       # 이메일
-                exp_str,     # 만료일
-                phone,       # 전화번호
-                remark,      # 비고
-                group,       # 그룹
-                group_no,    # 그룹 번호
-                friend_pay,  # 결제 여부 (user_data 기준)
-                friend_f,    # 지인 여부
-                "",          # 연장 개월수 (수동 입력)
-                "",          # 입금 여부   (수동 입력)
-                now_str      # 기록 시간
-            ])
-            sent_names.append(name)
+            run.journal.mark(keys[pos], "email_sent", rows[pos][0])
+            sent.append(pos)
+    sent.sort()
+    run.add_extends_rows([rows[pos] for pos in sorted(sent + resumed)])
+    sent_names = [rows[pos][0] for pos in sent]
+    run.stats["emailed"] += len(sent)
+    run.stats["resumed"] += len(resumed)
+    run.stats["deferred"] += len(deferred)
+
+    if resumed:
+        msg = "[record] 이전 실행에서 발송된 메일의 기록 복구:\n" + "\n".join(f"- {rows[pos][0]}" for pos in resumed)
+        send_telegram_message(msg)
 
     # 한 번에 묶어서 알림
     if sent_names:
         msg = "[record] 이메일 발송 대상:\n" + "\n".join(f"- {n}" for n in sent_names)
         send_telegram_message(msg)
 
-def check_payment_and_extend():
+    if deferred:
+        # 대상이 많을 수 있으므로 이름은 앞쪽 일부만
+        msg = f"[record] ⏸ 발송 한도({tenant.email_quota}통) 초과로 {len(deferred)}명 다음 실행으로 미룸:\n" + "\n".join(
+            f"- {rows[pos][0]}" for pos in deferred[:DEFERRED_LIST_LIMIT]
+        )
+        if len(deferred) > DEFERRED_LIST_LIMIT:
+            msg += f"\n… 외 {len(deferred) - DEFERRED_LIST_LIMIT}명"
+        send_telegram_message(msg)
+
+    failures = dispatcher.failures()
+    run.stats["email_failed"] += len(failures)
+    if failures:
+        msg = "[record] 이메일 발송 실패:\n" + "\n".join(f"- {e} ({err})" for e, err in failures)
+        send_telegram_message(msg)
+
+    if own_run:
+        run.commit()
+
+@timed("daily.check_payment_and_extend")
+def check_payment_and_extend(run=None):
     """
     1) extends_data에서 입금 여부(O)면 user_data 만료일 연장
     2) 미입금 & 삭제 기한 도달 시 user_data에서 삭제
     3) 처리된 레코드를 extends_data 및 user_data에서 제거
     """
-    df_ext  = get_sheet_df("extends_data")
-    df_main = get_sheet_df("user_data")
-    to_remove = []
+    own_run = run is None
+    run     = run or DailyRun()
+    df_ext  = run.df_ext
+    df_main = run.df_main
     extended = []
     dropped  = []
 
@@ -122,79 +292,140 @@ def check_payment_and_extend():
         send_telegram_message("[check] extends_data 시트가 비어 있습니다. 패스합니다.")
         return
 
-    for i, row in df_ext.iterrows():
-        # 필수 필드 유효성 검사
-        raw_exp   = row.get("만료일", "").strip()
-        raw_ts    = row.get("기록 시간", "").strip()
-        if not raw_exp or not raw_ts:
-            logging.info(f"[check] 스킵 (만료일 또는 기록 시간 누락) → {row.get('이름','')}")
-            continue
+    # 필수 필드 유효성 검사
+    old_exp   = _date_col(df_ext, "만료일")
+    record_ts = _date_col(df_ext, "기록 시간", "%Y-%m-%d %H:%M:%S")
+    valid     = old_exp.notna() & record_ts.notna()
+    for name in df_ext.loc[~valid, "이름"] if "이름" in df_ext.columns else []:
+        logging.info(f"[check] 스킵 (만료일 또는 기록 시간 누락) → {name}")
 
-        name      = row["이름"]
-        email     = row["이메일"]
-        old_exp   = datetime.strptime(raw_exp, "%Y-%m-%d").date()
-        record_ts = datetime.strptime(raw_ts, "%Y-%m-%d %H:%M:%S")
-        deposit   = row.get("입금 여부", "").strip().upper()
-        months    = row.get("연장 개월수", "").strip()
-        now       = datetime.now()
-
-        # 삭제 기한 계산
-        if old_exp > record_ts.date():
-            delete_deadline = datetime.combine(old_exp, datetime.max.time())
-        else:
-            delete_deadline = (record_ts + timedelta(days=1)).replace(hour=23, minute=59, second=59)
-
-        # 연장 처리
-        if deposit == "O":
-            idxs = df_main[df_main["이메일"] == email].index
-            if idxs.any():
-                j     = idxs[0]
-                prev  = datetime.strptime(df_main.loc[j, "만료일"], "%Y-%m-%d").date()
-                ext_m = 1
-                if "3" in months: ext_m = 3
-                if "6" in months: ext_m = 6
-                new_dt = prev + timedelta(days=30 * ext_m)
-                df_main.at[j, "만료일"] = new_dt.strftime("%Y-%m-%d")
-                extended.append(f"{name} ({ext_m}개월)")
-            to_remove.append(i)
-
-        # 삭제 처리
-        elif now >= delete_deadline:
-            idxs = df_main[df_main["이메일"] == email].index
-            if idxs.any():
-                df_main.drop(index=idxs, inplace=True)
-                dropped.append(name)
-            to_remove.append(i)
-
-    # 시트 갱신
-    if to_remove:
-        df_ext.drop(index=to_remove, inplace=True)
-        update_sheet_df("extends_data", df_ext)
-        update_sheet_df("user_data", df_main)
+    deposit = _text_col(df_ext, "입금 여부").str.upper()
+    months  = _text_col(df_ext, "연장 개월수")
+    emails  = _text_col(df_ext, "이메일")
+    now     = pd.Timestamp(datetime.now())
+
+    # 삭제 기한: 만료일이 기록일보다 뒤면 만료일 당일 끝, 아니면 기록 다음날 23:59:59
+    later    = old_exp > record_ts.dt.normalize()
+    deadline = (old_exp + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)).where(
+        later, record_ts.dt.normalize() + pd.Timedelta(days=1, hours=23, minutes=59, seconds=59)
+    )
+
+    extend_mask = valid & (deposit == "O")
+    drop_mask   = valid & ~extend_mask & (now >= deadline)
+
+    # 이메일 → user_data 행 (같은 이메일이 여러 줄이면 첫 줄 기준), 변경/삭제는 모았다가 한 번에 반영
+    users = UserStore.from_frame(df_main)
+    keys_email = emails.str.lower()
+    known = keys_email.map(users.__contains__).astype(bool)
+
+    # 연장 처리: 연장 개월수에 '6'이 있으면 6, '3'이 있으면 3, 아니면 1개월
+    ext_m = pd.Series(1, index=df_ext.index)
+    ext_m = ext_m.mask(months.str.contains("3", regex=False), 3)
+    ext_m = ext_m.mask(months.str.contains("6", regex=False), 6)
+
+    # 저널 키: 이메일|기록 시간 — 이전 실행에서 이미 만료일에 반영된 연장은 다시 더하지 않음
+    keys = emails + "|" + _text_col(df_ext, "기록 시간")
+    done_ext = keys.isin(run.journal.completed("extended"))
+    if done_ext.any():
+        logging.info(f"[check] 이전 실행에서 연장 완료된 {int((extend_mask & done_ext).sum())}건 건너뜀")
+
+    names = _text_col(df_ext, "이름")
+    ext_rows = df_ext.index[extend_mask & ~done_ext & known]
+    done = []
+    if len(ext_rows):
+        updated = set()
+        for email, days in (ext_m[ext_rows] * 30).groupby(keys_email[ext_rows]).sum().items():
+            prev = parse_date(users.get(email).expire)
+            if prev is None:
+                logging.warning(f"[check] 만료일 파싱 실패로 연장 불가 → {email}")
+                continue
+            new_expire = (prev + timedelta(days=int(days))).strftime("%Y-%m-%d")
+            users.update(email, "만료일", new_expire)
+            run.new_expires[email] = new_expire
+            updated.add(email)
+        done = [i for i in ext_rows if keys_email[i] in updated]
+        extended = [f"{names[i]} ({ext_m[i]}개월)" for i in done]
+        run.pending_marks.extend((keys[i], "extended", names[i]) for i in done)
+
+    # 삭제 처리: 해당 이메일의 user_data 행 전부 삭제 (apply 때 한 번에)
+    drop_hit = df_ext.index[drop_mask & known]
+    if len(drop_hit):
+        for i in drop_hit:
+            if users.delete(keys_email[i]):
+                dropped.append(names[i])
+                run.dropped_emails.append(keys_email[i])
+        run.pending_marks.extend((keys[i], "dropped", names[i]) for i in drop_hit)
+    df_main = users.apply(df_main)
+
+    # 삭제 기한이 지난 미입금 기록 중 user_data에 이미 없는 이메일은 지울 사용자가 없으므로 기록만 정리
+    orphans = df_ext.index[drop_mask & ~known]
+
+    # 실제로 반영된 레코드만 제거 (시트 반영은 commit 때)
+    # 이전 실행에서 연장까지 끝났지만 행 삭제만 못 한 레코드는 저널 기준으로 함께 제거
+    to_remove = df_ext.index[extend_mask & done_ext].union(pd.Index(done)).union(drop_hit).union(orphans)
+    run.df_ext  = df_ext.drop(index=to_remove)
+    # 입금은 확인됐지만 연장하지 못한 행 (user_data에 없는 이메일/만료일 형식 오류)은 남겨 두고 알림
+    unapplied = df_ext.index[extend_mask].difference(to_remove)
+    run.df_main = df_main
+    run.stats["extended"] += len(extended)
+    run.stats["dropped"] += len(dropped)
+    if own_run:
+        run.commit()
 
     # 결과 알림
     if extended:
         send_telegram_message("[extend] 연장 처리 완료:\n" + "\n".join(f"- {e}" for e in extended))
     if dropped:
         send_telegram_message("[drop] 탈락 사용자 삭제:\n" + "\n".join(f"- {n}" for n in dropped))
-    if not extended and not dropped:
+    if len(unapplied):
+        send_telegram_message("[check] ⚠️ 입금 확인됐지만 연장하지 못함 (extends_data에 남겨 둠):\n" + "\n".join(
+            f"- {names[i]} / {emails[i]} ({'user_data에 없음' if not known[i] else '만료일 형식 오류'})"
+            for i in unapplied
+        ))
+    if len(orphans):
+        send_telegram_message("[drop] user_data에 없는 미입금 기록 정리:\n" + "\n".join(
+            f"- {names[i]} / {emails[i]}" for i in orphans
+        ))
+    if not extended and not dropped and not len(unapplied) and not len(orphans):
         send_telegram_message("[check] 연장/삭제 대상 없음")
 
-def handle_phone_list_for_sms():
+@timed("daily.handle_phone_list_for_sms")
+def handle_phone_list_for_sms(run=None):
     """
-    문자 발송용: extends_data의 이름·전화번호를 묶어서 두 번에 나눠 전송
+    문자 발송용: extends_data의 이름·전화번호를 파일(csv/xlsx)로 내보내 텔레그램 문서로 전송.
+    행은 하나씩 파일에 쓰므로 대상 수와 상관없이 메시지 길이 제한/메모리 문제가 없고,
+    대상이 SMS_INLINE_MAX명 이하면 바로 복사할 수 있게 번호 목록 메시지도 함께 보냅니다.
     """
-    df_ext = get_sheet_df("extends_data")
+    # 단독 실행이면 필요한 두 열만 받아 옴
+    df_ext = run.df_ext if run is not None else fetch_sheet_columns("extends_data", ["이름", "전화번호"])
     if df_ext.empty or "전화번호" not in df_ext.columns:
         send_telegram_message("[sms] 대상 없음")
         return
 
-    names  = df_ext["이름"].dropna().tolist()
-    phones = [format_phone(p) for p in df_ext["전화번호"].dropna().tolist() if p.strip()]
+    inline = []
+    names = df_ext["이름"] if "이름" in df_ext.columns else [""] * len(df_ext)
+
+    def rows():
+        for row in phone_rows(zip(names, df_ext["전화번호"])):
+            if len(inline) <= SMS_INLINE_MAX:
+                inline.append(row[1])
+            yield row
 
-    if not names:
+    tenant = current_tenant()
+    name = f"sms_{tenant.name}" if tenant.name else "sms"
+    label = f" [{tenant.name}]" if tenant.name else ""
+    sent = send_export(name, ["이름", "전화번호"], rows(), caption=f"[sms]{label} 문자 발송 대상 {{count}}명")
+    if sent == 0:
         send_telegram_message("[sms] 대상 없음")
         return
+    if sent is None:
+        # 파일을 못 보냈으면 인원과 상관없이 전체 번호를 메시지로
+        # (긴 메시지는 send_telegram_message가 줄 단위로 나눠 보내므로 번호가 잘리지 않게 한 줄에 하나씩)
+        numbers = [phone for _, phone in phone_rows(zip(names, df_ext["전화번호"]))]
+        send_telegram_message("[sms] ⚠️ 번호 목록 파일 전송 실패 — 메시지로 보냅니다.")
+        send_telegram_message("[번호목록]\n" + "\n".join(numbers))
+        return
 
-    # 한 번에 복붙하기 좋게 2개 메시지로 분리
-    send_telegram_message("[번호목록]\n" + ", ".join(phones))
+    # 적으면 한 번에 복붙할 수 있게 메시지로도
+    if len(inline) <= SMS_INLINE_MAX:
+        send_telegram_message("[번호목록]\n" + ", ".join(inline))
@@ -0,0 +1,36 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    스레드 안전한 토큰 버킷.
+    초당 rate개씩 토큰이 차고 최대 burst개까지 쌓이며, acquire()는 토큰이 생길 때까지 기다립니다.
+    rate가 0 이하면 제한 없이 바로 통과합니다.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens=1.0):
+        """토큰을 예약하고, 실제로 쓸 수 있을 때까지 기다려야 하는 시간(초)을 반환"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens=1.0):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
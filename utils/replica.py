@@ -0,0 +1,251 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from utils.lazy import lazy_import
+from utils.metrics import track
+from utils.tenant import current_tenant
+
+# 봇 시작을 가볍게 하기 위해 첫 사용 때 불러옴
+pd = lazy_import("pandas")
+sheet_helper = lazy_import("utils.sheet_helper")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPLICA_PATH = os.environ.get("SHEET_REPLICA_PATH", os.path.join(ROOT, "sheet_replica.sqlite3"))
+# 주기 동기화 간격(초). 이보다 오래된 사본은 읽을 때 먼저 동기화
+REPLICA_SYNC_INTERVAL = float(os.environ.get("REPLICA_SYNC_INTERVAL", "60"))
+# 로컬 사본으로 관리하는 시트
+REPLICA_SHEETS = ("user_data", "extends_data")
+
+def _row_hash(data: str) -> str:
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
+
+class SheetReplica:
+    """
+    user_data/extends_data 시트의 로컬 SQLite 사본.
+    - 행은 시트 순서(pos)대로 JSON으로 저장합니다. 조회는 모두 시트 전체를 읽어
+      메모리 인덱스(UserStore/ExpiryIndex)를 만드는 용도라 이메일/만료일 열 인덱스는 두지 않습니다.
+    - sync()는 시트를 한 번 읽어 행 해시가 바뀐 행만 고쳐 씁니다.
+    - 조회 실패(빈 결과)면 기존 사본을 그대로 두고, 봇은 마지막 사본으로 계속 응답합니다.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or current_tenant().path_for(REPLICA_PATH)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS sheets ("
+            " name TEXT PRIMARY KEY, header TEXT NOT NULL, synced_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " sheet TEXT NOT NULL, pos INTEGER NOT NULL, hash TEXT NOT NULL, data TEXT NOT NULL,"
+            " PRIMARY KEY (sheet, pos));"
+        )
+
+    # ------------------------------------------------------------ 쓰기
+
+    def load(self, sheet_name, df):
+        """
+        DataFrame(시트 순서)을 사본에 반영합니다. 해시가 같은 행은 건드리지 않습니다.
+        반환값: 바뀐(추가 포함) 행 수 + 지워진 행 수
+        """
+        header = json.dumps(list(df.columns), ensure_ascii=False)
+        rows = []
+        for pos, record in enumerate(sheet_helper.frame_records(df)):
+            data = json.dumps(record, ensure_ascii=False, default=str)
+            rows.append((pos, _row_hash(data), data))
+
+        with self._lock:
+            known = dict(self._conn.execute(
+                "SELECT pos, hash FROM rows WHERE sheet = ?", (sheet_name,)
+            ).fetchall())
+            changed = [(sheet_name, *row) for row in rows if known.get(row[0]) != row[1]]
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?)", changed)
+            deleted = self._conn.execute(
+                "DELETE FROM rows WHERE sheet = ? AND pos >= ?", (sheet_name, len(rows))
+            ).rowcount
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sheets VALUES (?, ?, ?)", (sheet_name, header, time.time())
+            )
+            self._conn.execute("COMMIT")
+
+        if changed or deleted:
+            logging.info(f"[SheetReplica] '{sheet_name}' 변경 {len(changed)}행, 삭제 {deleted}행")
+        return len(changed) + deleted
+
+    def append(self, sheet_name, rows):
+        """시트 끝에 추가된 행(값 목록)을 사본 끝에도 추가"""
+        header = self.header(sheet_name)
+        if not rows or header is None:
+            return
+        with self._lock:
+            (start,) = self._conn.execute(
+                "SELECT COALESCE(MAX(pos) + 1, 0) FROM rows WHERE sheet = ?", (sheet_name,)
+            ).fetchone()
+            entries = []
+            for pos, row in enumerate(rows, start):
+                record = dict(zip(header, row))
+                data = json.dumps(record, ensure_ascii=False, default=str)
+                entries.append((sheet_name, pos, _row_hash(data), data))
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?)", entries)
+            self._conn.execute("COMMIT")
+
+    def sync(self, sheet_name):
+        """
+        시트를 한 번 읽어 사본을 갱신하고 바뀐 행 수를 반환합니다.
+        조회에 실패하면(빈 결과) 사본은 그대로 두고 None을 반환합니다.
+        """
+        with track("replica.sync") as t:
+            # 헤더의 모든 열을 페이지 단위로 받음 (get_all_records처럼 행마다 dict를 만들지 않음)
+            df = sheet_helper.fetch_sheet_columns(sheet_name, compact=False)
+            if df.empty and not len(df.columns):
+                logging.warning(f"[SheetReplica] '{sheet_name}' 조회 실패 — 기존 사본 유지")
+                t.fail()
+                return None
+            return self.load(sheet_name, df)
+
+    def mark_stale(self, sheet_name):
+        """다음 읽기 때 나이와 상관없이 다시 동기화하도록 표시 (시트에 일부만 반영됐을 때)"""
+        with self._lock:
+            self._conn.execute("UPDATE sheets SET synced_at = 0 WHERE name = ?", (sheet_name,))
+
+    # ------------------------------------------------------------ 읽기
+
+    def header(self, sheet_name):
+        with self._lock:
+            row = self._conn.execute("SELECT header FROM sheets WHERE name = ?", (sheet_name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def age(self, sheet_name):
+        """마지막 동기화 후 지난 시간(초). 한 번도 동기화하지 않았으면 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT synced_at FROM sheets WHERE name = ?", (sheet_name,)).fetchone()
+        return time.time() - row[0] if row else None
+
+    def records(self, sheet_name):
+        """get_all_records와 같은 모양의 행 목록 (시트 순서)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM rows WHERE sheet = ? ORDER BY pos", (sheet_name,)
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def iter_records(self, sheet_name, batch=500):
+        """
+        records()와 같은 행을 batch개씩 꺼내 하나씩 내보내는 제너레이터 (행 수와 상관없이 메모리 일정).
+        별도 읽기 연결을 쓰므로 내보내는 동안 동기화/쓰기를 막지 않고, 시작 시점의 내용을 그대로 읽습니다.
+        """
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute("SELECT data FROM rows WHERE sheet = ? ORDER BY pos", (sheet_name,))
+            while True:
+                chunk = cursor.fetchmany(batch)
+                if not chunk:
+                    return
+                for (data,) in chunk:
+                    yield json.loads(data)
+        finally:
+            conn.close()
+
+    def frame(self, sheet_name):
+        """get_sheet_df와 같은 모양의 DataFrame (사본이 없으면 빈 DataFrame)"""
+        header = self.header(sheet_name)
+        if header is None:
+            return pd.DataFrame()
+        return pd.DataFrame(self.records(sheet_name), columns=header)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# 테넌트 이름 → 사본 (테넌트마다 별도 파일)
+_replicas = {}
+_replica_lock = threading.Lock()
+
+def get_replica() -> SheetReplica:
+    """현재 테넌트의 로컬 사본"""
+    tenant = current_tenant()
+    with _replica_lock:
+        replica = _replicas.get(tenant.name)
+        if replica is None:
+            replica = _replicas[tenant.name] = SheetReplica(tenant.path_for(REPLICA_PATH))
+        return replica
+
+def _refresh(replica, sheet_name, max_age):
+    """사본이 max_age초(기본 REPLICA_SYNC_INTERVAL)보다 오래되었으면 동기화. 동기화에 실패하면 False"""
+    max_age = REPLICA_SYNC_INTERVAL if max_age is None else max_age
+    age = replica.age(sheet_name)
+    if age is None or age >= max_age:
+        return replica.sync(sheet_name) is not None
+    return True
+
+def read_sheet_df(sheet_name, max_age=None, stale_ok=True):
+    """
+    사본에서 시트를 읽습니다. 사본이 max_age초(기본 REPLICA_SYNC_INTERVAL)보다 오래되었으면
+    먼저 동기화하고, 동기화에 실패하면 마지막 사본을 돌려줍니다.
+    stale_ok=False면 동기화 실패 시 get_sheet_df처럼 빈 DataFrame을 반환합니다. (시트에 다시 쓰는 쪽용)
+    """
+    replica = get_replica()
+    if not _refresh(replica, sheet_name, max_age) and not stale_ok:
+        return pd.DataFrame()
+    return replica.frame(sheet_name)
+
+def iter_sheet_records(sheet_name, max_age=None):
+    """
+    (열 목록, 행 제너레이터). 오래된 사본은 먼저 동기화하고, 행은 사본에서 조금씩 읽어 냅니다. (내보내기용)
+    사본이 한 번도 만들어지지 않았으면 ([], 빈 제너레이터)
+    """
+    replica = get_replica()
+    _refresh(replica, sheet_name, max_age)
+    return replica.header(sheet_name) or [], replica.iter_records(sheet_name)
+
+def sync_all():
+    """관리 중인 시트를 모두 동기화하고 바뀐 행 수 합계를 반환 (실패한 시트는 건너뜀)"""
+    replica = get_replica()
+    return sum(replica.sync(sheet_name) or 0 for sheet_name in REPLICA_SHEETS)
+
+def write_sheet_df(sheet_name, df, original=None):
+    """
+    update_sheet_df로 시트에 쓰고, 전부 반영되면 사본에도 같은 내용을 반영 (write-through).
+    일부 단계만 반영됐으면 사본을 오래된 것으로 표시해 다음 읽기 때 시트에서 다시 맞춥니다.
+    반환값은 update_sheet_df의 UpdateReport
+    열이 없는 df(읽기 실패로 받은 빈 DataFrame)는 시트도 사본도 지우지 않도록 쓰지 않습니다.
+    """
+    if not len(df.columns):
+        report = sheet_helper.UpdateReport()
+        report.error = "열이 없는 DataFrame (읽기 실패) — 쓰지 않음"
+        logging.error(f"[write_sheet_df] '{sheet_name}': {report.error}")
+        return report
+    report = sheet_helper.update_sheet_df(sheet_name, df, original=original)
+    if report.ok:
+        get_replica().load(sheet_name, df)
+    elif report.applied:
+        get_replica().mark_stale(sheet_name)
+    return report
+
+def append_sheet_rows(sheet_name, rows, chunk_size=None):
+    """append_rows로 시트에 추가하고, 기록된 행만 사본 끝에도 추가 (write-through)"""
+    report = sheet_helper.append_rows(sheet_name, rows, chunk_size)
+    if report.succeeded:
+        get_replica().append(sheet_name, report.succeeded)
+    return report
+
+async def async_read_records(sheet_name, max_age=None, timeout=None):
+    """read_sheet_df의 비동기 버전 — 사용자 명령어용으로 행 목록을 반환 (시트 전용 스레드 풀에서 실행)"""
+    df = await sheet_helper.run_in_pool(read_sheet_df, sheet_name, max_age, timeout=timeout)
+    return sheet_helper.frame_records(df)
+
+async def async_iter_sheet_records(sheet_name, max_age=None, timeout=None):
+    """iter_sheet_records의 비동기 버전 (동기화는 시트 전용 스레드 풀에서, 행은 나중에 읽을 때 사본에서)"""
+    return await sheet_helper.run_in_pool(iter_sheet_records, sheet_name, max_age, timeout=timeout)
+
+async def async_sync_all(timeout=None):
+    """sync_all의 비동기 버전 (시트 전용 스레드 풀에서 실행)"""
+    return await sheet_helper.run_in_pool(sync_all, timeout=timeout)
@@ -1,86 +1,436 @@
+import asyncio
+import contextvars
+import functools
+import json
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import gspread
+from gspread.utils import numericise, rowcol_to_a1
 import pandas as pd
+from oauth2client.client import AccessTokenRefreshError
 from oauth2client.service_account import ServiceAccountCredentials
 
+from utils.metrics import track
+from utils.tenant import current_tenant
+
+SCOPE = [
+    'https://spreadsheets.google.com/feeds',
+    'https://www.googleapis.com/auth/drive'
+]
+
+# 액세스 토큰 유효시간(1시간)보다 조금 짧게 잡아 만료 전에 재인증
+CLIENT_TTL_SECONDS = 50 * 60
+
+# 비동기 API용 스레드 풀 크기와 호출당 기본 타임아웃(초)
+SHEETS_MAX_WORKERS = int(os.environ.get("SHEETS_MAX_WORKERS", "4"))
+SHEETS_TIMEOUT = float(os.environ.get("SHEETS_TIMEOUT", "30"))
+
+# append_rows 한 번에 보낼 최대 행 수 (요청 크기 제한 대비)
+APPEND_CHUNK_SIZE = int(os.environ.get("APPEND_CHUNK_SIZE", "500"))
+
+# fetch_sheet_columns가 한 번에 요청하는 행 수 (A1 범위 페이지 크기)
+FETCH_PAGE_ROWS = int(os.environ.get("SHEETS_PAGE_ROWS", "2000"))
+# fetch_sheet_columns의 열별 dtype: 값 종류가 적은 열은 category, 날짜 열은 datetime64
+CATEGORY_COLUMNS = ("그룹", "비고", "결제 여부")
+DATE_COLUMNS = {"만료일": "%Y-%m-%d"}
+# 숫자처럼 보여도 숫자로 바꾸지 않는 열 (앞자리 0 보존)
+TEXT_COLUMNS = ("전화번호",)
+
+_executor = ThreadPoolExecutor(max_workers=SHEETS_MAX_WORKERS, thread_name_prefix="sheets")
+
+# 프로세스 전역 클라이언트/워크시트 캐시
+_cache_lock = threading.RLock()
+_client = None
+_client_created_at = 0.0
+_worksheets = {}
+
 def get_google_client():
-    """구글 시트 클라이언트를 생성하는 함수"""
-    try:
-        logging.info("[get_google_client] Creating service_account.json from environment variable.")
-        with open("service_account.json", "w", encoding="utf-8") as f:
-            f.write(os.environ['GOOGLE_JSON_KEY'])
+    """구글 시트 클라이언트를 반환 (프로세스 전역 캐시, 만료 시 재인증)"""
+    global _client, _client_created_at
+    with _cache_lock:
+        if _client is not None and time.monotonic() - _client_created_at < CLIENT_TTL_SECONDS:
+            return _client
 
-        scope = [
-            'https://spreadsheets.google.com/feeds',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        creds = ServiceAccountCredentials.from_json_keyfile_name("service_account.json", scope)
-        client = gspread.authorize(creds)
+        try:
+            logging.info("[get_google_client] Authorizing with credentials from environment variable.")
+            key_dict = json.loads(os.environ['GOOGLE_JSON_KEY'])
+            creds = ServiceAccountCredentials.from_json_keyfile_dict(key_dict, SCOPE)
+            client = gspread.authorize(creds)
+        except Exception as e:
+            logging.error(f"[get_google_client] Failed to create Google client: {e}")
+            raise e
 
+        # 새 클라이언트로 바뀌면 이전 클라이언트에 묶인 워크시트 핸들도 버린다
+        _client = client
+        _client_created_at = time.monotonic()
+        _worksheets.clear()
         logging.info("[get_google_client] Google Sheets client created successfully.")
-        return client
+        return _client
 
-    except Exception as e:
-        logging.error(f"[get_google_client] Failed to create Google client: {e}")
-        raise e
+def get_spreadsheet_id():
+    """현재 테넌트의 스프레드시트 ID (기본 테넌트는 SPREADSHEET_ID 환경변수)"""
+    spreadsheet_id = current_tenant().spreadsheet_id or os.environ.get('SPREADSHEET_ID')
+    if not spreadsheet_id:
+        raise ValueError("SPREADSHEET_ID 환경변수가 설정되지 않았습니다.")
+    return spreadsheet_id
+
+def get_worksheet(sheet_name):
+    """워크시트 핸들을 캐시에서 꺼내거나, 없으면 한 번만 열어서 캐시"""
+    with _cache_lock:
+        client = get_google_client()
+        key = (get_spreadsheet_id(), sheet_name)
+        sheet = _worksheets.get(key)
+        if sheet is None:
+            logging.info(f"[get_worksheet] Opening worksheet: {sheet_name}")
+            sheet = client.open_by_key(key[0]).worksheet(sheet_name)
+            _worksheets[key] = sheet
+        return sheet
+
+def reset_google_client():
+    """캐시된 클라이언트와 워크시트 핸들을 모두 폐기 (인증 오류 등 복구용)"""
+    global _client, _client_created_at
+    with _cache_lock:
+        _client = None
+        _client_created_at = 0.0
+        _worksheets.clear()
+
+# 캐시된 클라이언트를 버리고 다시 인증해야 하는 API 오류 코드 (인증 만료/권한 오류)
+_REAUTH_CODES = (401, 403)
+
+def _on_sheet_error(e):
+    """
+    인증 오류(401/403, 토큰 갱신 실패)일 때만 다음 호출에서 새로 연결하도록 캐시를 비움.
+    할당량 초과(429)나 범위 오류(400), 없는 시트(404)는 다시 인증해도 소용없으므로 캐시를 유지합니다.
+    """
+    if isinstance(e, gspread.exceptions.APIError) and e.code in _REAUTH_CODES \
+            or isinstance(e, AccessTokenRefreshError):
+        logging.warning(f"[_on_sheet_error] 인증 오류로 클라이언트 재생성 예정: {e}")
+        reset_google_client()
 
 def get_sheet_df(sheet_name="user_data"):
     """구글 시트에서 데이터를 가져와서 pandas DataFrame으로 반환"""
     try:
-        logging.info(f"[get_sheet_df] Fetching data from sheet: {sheet_name}")
-        client = get_google_client()
+        with track("sheets.read"):
+            logging.info(f"[get_sheet_df] Fetching data from sheet: {sheet_name}")
+            sheet = get_worksheet(sheet_name)
+            data = sheet.get_all_records()
+            logging.info(f"[get_sheet_df] Retrieved {len(data)} rows from '{sheet_name}'.")
 
-        spreadsheet_id = os.environ.get('SPREADSHEET_ID')
-        if not spreadsheet_id:
-            raise ValueError("SPREADSHEET_ID 환경변수가 설정되지 않았습니다.")
+            # 헤더만 있는 시트도 열 정보는 남겨 조회 실패(열 없는 빈 DataFrame)와 구분
+            df = pd.DataFrame(data) if data else pd.DataFrame(columns=sheet.row_values(1))
+            logging.info(f"[get_sheet_df] DataFrame shape: {df.shape}")
+            return df
 
-        sheet = client.open_by_key(spreadsheet_id).worksheet(sheet_name)
-        data = sheet.get_all_records()
-        logging.info(f"[get_sheet_df] Retrieved {len(data)} rows from '{sheet_name}'.")
+    except Exception as e:
+        _on_sheet_error(e)
+        logging.error(f"[get_sheet_df] Error fetching data from sheet '{sheet_name}': {e}")
+        return pd.DataFrame()
 
-        df = pd.DataFrame(data)
-        logging.info(f"[get_sheet_df] DataFrame shape: {df.shape}")
-        return df
+def _column_spans(positions):
+    """열 번호(1부터) 목록을 연속 구간 [(시작, 끝), ...]으로 묶음"""
+    spans = []
+    for pos in sorted(positions):
+        if spans and spans[-1][1] == pos - 1:
+            spans[-1][1] = pos
+        else:
+            spans.append([pos, pos])
+    return spans
+
+def _compact_series(name, values):
+    if name in DATE_COLUMNS:
+        text = pd.Series(values, dtype=object).astype(str).str.strip()
+        return pd.to_datetime(text, format=DATE_COLUMNS[name], errors="coerce")
+    if name in CATEGORY_COLUMNS:
+        return pd.Series(pd.Categorical(values))
+    if name in TEXT_COLUMNS:
+        return pd.Series([str(v) for v in values], dtype=object)
+    # 나머지는 get_all_records와 같은 숫자 변환
+    return pd.Series([numericise(v) for v in values])
+
+def _grid_row_count(sheet):
+    """
+    시트 격자의 현재 행 수. 캐시된 워크시트 핸들의 row_count는 다른 사용자가 행을 늘리면
+    오래된 값이 되므로 시트 속성만 새로 조회합니다.
+    """
+    meta = sheet.spreadsheet.fetch_sheet_metadata(
+        {"fields": "sheets.properties(sheetId,gridProperties.rowCount)"}
+    )
+    for entry in meta.get("sheets", []):
+        props = entry.get("properties", {})
+        if props.get("sheetId") == sheet.id:
+            return props["gridProperties"]["rowCount"]
+    return sheet.row_count
+
+def fetch_sheet_columns(sheet_name, columns=None, rows=None, page_rows=None, compact=True):
+    """
+    필요한 열만 A1 범위 페이지로 나눠 받아 DataFrame으로 반환합니다.
+    — columns: 받을 열 이름 목록 (시트에 없는 열은 빈 값으로 채움, None이면 헤더의 모든 열)
+    — rows: (시작, 끝) 데이터 행 범위, 헤더 다음 행이 1이고 끝 포함 (None이면 끝까지)
+    — compact: 그룹/비고/결제 여부는 category, 만료일은 datetime64(빈칸/형식 오류는 NaT), 전화번호는 문자열 그대로.
+      False면 get_sheet_df(get_all_records)처럼 숫자만 변환한 값 (시트에 다시 쓰는 쪽/로컬 사본용, 전화번호는 앞자리 0 보존)
+    시트 격자의 마지막 행까지 페이지를 넘기고, 빈 칸 때문에 짧게 온 페이지도 빈 값으로 채워
+    모든 열의 길이(= 시트 행 위치)를 맞춥니다. 값이 하나도 없는 뒤쪽 행만 잘라 냅니다.
+    전송량과 메모리가 요청한 열 수에 비례합니다. 실패하면 빈 DataFrame을 반환합니다.
+    """
+    page_rows = page_rows or FETCH_PAGE_ROWS
+    try:
+        with track("sheets.fetch_columns"):
+            logging.info(f"[fetch_sheet_columns] Fetching {columns or 'all columns'} from sheet: {sheet_name}")
+            sheet = get_worksheet(sheet_name)
+            header = sheet.row_values(1)
+            if columns is None:
+                duplicates = sorted({name for name in header if header.count(name) > 1})
+                if duplicates:
+                    raise gspread.exceptions.GSpreadException(f"헤더에 중복된 열 이름: {duplicates}")
+                columns = header
+            positions = {name: header.index(name) + 1 for name in columns if name in header}
+            spans = _column_spans(positions.values())
+            values = {pos: [] for pos in positions.values()}
+
+            start = 2 + (rows[0] - 1 if rows else 0)
+            last = _grid_row_count(sheet)
+            if rows:
+                last = min(last, rows[1] + 1)
+            while spans and start <= last:
+                end = min(start + page_rows - 1, last)
+                pages = sheet.batch_get([
+                    f"{rowcol_to_a1(start, lo)}:{rowcol_to_a1(end, hi)}" for lo, hi in spans
+                ])
+                # 범위마다 뒤쪽 빈 행/빈 칸은 잘려서 오므로 요청한 페이지 높이까지 빈 값으로 채움
+                height = end - start + 1
+                for (lo, hi), page in zip(spans, pages):
+                    for offset in range(hi - lo + 1):
+                        column = values[lo + offset]
+                        column.extend(row[offset] if offset < len(row) else "" for row in page)
+                        column.extend([""] * (height - len(page)))
+                start = end + 1
+
+            # 값이 없는 뒤쪽 격자 행만 정리 (중간의 빈 행은 시트 행 번호와 맞도록 그대로 둠)
+            fetched = len(next(iter(values.values()), []))
+            while fetched and all(column[fetched - 1] == "" for column in values.values()):
+                fetched -= 1
+
+            def series(name):
+                column = values[positions[name]][:fetched] if name in positions else [""] * fetched
+                if compact:
+                    return _compact_series(name, column)
+                if name in TEXT_COLUMNS:
+                    return pd.Series(column, dtype=object)
+                return pd.Series([numericise(v) for v in column])
+
+            df = pd.DataFrame({name: series(name) for name in columns}, columns=list(columns))
+            logging.info(f"[fetch_sheet_columns] Retrieved {len(df)} rows x {len(columns)} columns from '{sheet_name}'.")
+            return df
 
     except Exception as e:
-        logging.error(f"[get_sheet_df] Error fetching data from sheet '{sheet_name}': {e}")
+        _on_sheet_error(e)
+        logging.error(f"[fetch_sheet_columns] Error fetching columns from sheet '{sheet_name}': {e}")
         return pd.DataFrame()
 
 def append_row(sheet_name, row_data: list):
     """지정된 시트에 한 줄 데이터를 추가"""
     try:
-        logging.info(f"[append_row] Appending row to sheet: {sheet_name}")
-        client = get_google_client()
-
-        spreadsheet_id = os.environ.get('SPREADSHEET_ID')
-        if not spreadsheet_id:
-            raise ValueError("SPREADSHEET_ID 환경변수가 설정되지 않았습니다.")
-
-        sheet = client.open_by_key(spreadsheet_id).worksheet(sheet_name)
-        sheet.append_row(row_data, value_input_option="USER_ENTERED")
-        logging.info(f"[append_row] Row appended: {row_data}")
+        with track("sheets.append_row"):
+            logging.info(f"[append_row] Appending row to sheet: {sheet_name}")
+            sheet = get_worksheet(sheet_name)
+            sheet.append_row(row_data, value_input_option="USER_ENTERED")
+            logging.info(f"[append_row] Row appended: {row_data}")
 
     except Exception as e:
+        _on_sheet_error(e)
         logging.error(f"[append_row] Error appending row to sheet '{sheet_name}': {e}")
 
-def update_sheet_df(sheet_name, df):
+class AppendReport:
+    """append_rows 결과: 성공한 행과 (행, 오류) 형태의 실패 목록"""
+
+    def __init__(self):
+        self.succeeded = []
+        self.failed = []
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def __repr__(self):
+        return f"AppendReport(succeeded={len(self.succeeded)}, failed={len(self.failed)})"
+
+def append_rows(sheet_name, rows: list, chunk_size=None) -> AppendReport:
+    """
+    지정된 시트에 여러 줄을 추가합니다.
+    chunk_size개씩 끊어 청크당 한 번의 append_rows API 호출로 보내고,
+    실패한 청크의 행은 오류와 함께 report.failed에 담아 돌려줍니다.
+    (응답 유실 시 중복 기록을 막기 위해 자동 재시도는 하지 않음)
+    """
+    report = AppendReport()
+    if not rows:
+        return report
+    chunk_size = chunk_size or APPEND_CHUNK_SIZE
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            logging.info(f"[append_rows] Appending {len(chunk)} rows to sheet: {sheet_name}")
+            with track("sheets.append_rows"):
+                sheet = get_worksheet(sheet_name)
+                sheet.append_rows(chunk, value_input_option="USER_ENTERED")
+            report.succeeded.extend(chunk)
+
+        except Exception as e:
+            _on_sheet_error(e)
+            logging.error(f"[append_rows] Error appending {len(chunk)} rows to sheet '{sheet_name}': {e}")
+            report.failed.extend((row, str(e)) for row in chunk)
+
+    logging.info(f"[append_rows] '{sheet_name}': {report}")
+    return report
+
+def frame_records(df):
+    """DataFrame → get_all_records 모양의 dict 목록 (to_dict보다 빠르게 열 단위로 변환)"""
+    columns = list(df.columns)
+    values = [df[column].tolist() for column in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+def _to_cell(value):
+    """numpy 스칼라/NaN을 시트에 쓸 수 있는 파이썬 값으로 변환"""
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return ""
+    return value
+
+def diff_sheet_df(original, df):
+    """
+    get_sheet_df로 읽은 original과 수정된 df를 비교해
+    (바뀐 셀 목록, 삭제된 시트 행 번호 목록, 추가된 행 목록)을 반환합니다.
+    original은 시트 순서 그대로의 RangeIndex여야 하며, 행 i는 시트의 i+2번째 행입니다.
+    비교할 수 없는 경우(열 구성 변경 등) None을 반환합니다.
+    """
+    if list(original.columns) != list(df.columns):
+        return None
+    if not original.index.equals(pd.RangeIndex(len(original))):
+        return None
+
+    columns = list(df.columns)
+    kept = df.index.intersection(original.index)
+    deleted = sorted(set(original.index) - set(df.index))
+    added = [[_to_cell(v) for v in row] for row in df.loc[df.index.difference(original.index)].values.tolist()]
+
+    cells = []
+    if len(kept):
+        before = original.loc[kept, columns].astype(str)
+        after = df.loc[kept, columns].astype(str)
+        changed = (before != after).to_numpy().nonzero()
+        for r, c in zip(*changed):
+            label = int(kept[r])
+            cells.append((label + 2, int(c) + 1, _to_cell(df.at[label, columns[c]])))
+
+    return cells, [int(label) + 2 for label in deleted], added
+
+def _delete_row_ranges(sheet, rows):
+    """삭제할 시트 행 번호들을 연속 구간으로 묶어 아래쪽부터 한 번의 batch_update로 삭제"""
+    ranges = []
+    for row in sorted(rows):
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+
+    requests = [{
+        "deleteDimension": {
+            "range": {
+                "sheetId": sheet.id,
+                "dimension": "ROWS",
+                "startIndex": start - 1,
+                "endIndex": end,
+            }
+        }
+    } for start, end in reversed(ranges)]
+    sheet.spreadsheet.batch_update({"requests": requests})
+
+# update_sheet_df의 반영 단계: 셀 수정 → 행 삭제 → 행 추가
+UPDATE_PHASES = ("cells", "deleted", "added")
+
+class UpdateReport:
     """
-    DataFrame 전체를 해당 시트에 덮어쓰기 합니다.
-    — 기존 데이터를 지우고, 새 DataFrame의 헤더+값을 업데이트
+    update_sheet_df 결과: 반영을 마친 단계(UPDATE_PHASES 중)와 실패 시 오류.
+    차분 반영은 여러 번의 API 호출이라 중간에 실패하면 앞 단계만 반영된 채로 남습니다.
+    (할 일이 없던 단계도 마친 것으로 칩니다)
     """
+
+    def __init__(self):
+        self.applied = set()
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.error is None and self.applied >= set(UPDATE_PHASES)
+
+    def done(self, phase) -> bool:
+        return phase in self.applied
+
+    def __repr__(self):
+        return f"UpdateReport(applied={sorted(self.applied)}, error={self.error!r})"
+
+def update_sheet_df(sheet_name, df, original=None) -> UpdateReport:
+    """
+    DataFrame을 해당 시트에 반영합니다.
+    — original(처음 읽어 온 DataFrame)을 주면 바뀐 셀만 batch_update하고 삭제된 행만 지웁니다.
+    — original이 없거나 비교가 불가능하면 기존처럼 시트를 지우고 헤더+값 전체를 다시 씁니다.
+    차분 반영은 읽은 뒤 시트 중간에 행이 끼어들지 않았다는 전제에서만 안전합니다.
+    반영을 마친 단계는 UpdateReport로 알려 주므로, 중간에 실패해도 이미 반영된 단계는 구분할 수 있습니다.
+    """
+    report = UpdateReport()
     try:
-        logging.info(f"[update_sheet_df] Updating entire sheet: {sheet_name}")
-        client = get_google_client()
+        with track("sheets.update"):
+            diff = diff_sheet_df(original, df) if original is not None else None
+            sheet = get_worksheet(sheet_name)
 
-        spreadsheet_id = os.environ.get('SPREADSHEET_ID')
-        if not spreadsheet_id:
-            raise ValueError("SPREADSHEET_ID 환경변수가 설정되지 않았습니다.")
+            if diff is None:
+                logging.info(f"[update_sheet_df] Updating entire sheet: {sheet_name}")
+                sheet.clear()
+                sheet.update([df.columns.tolist()] + df.values.tolist())
+                report.applied.update(UPDATE_PHASES)
+                logging.info(f"[update_sheet_df] Sheet '{sheet_name}' updated successfully.")
+                return report
 
-        sheet = client.open_by_key(spreadsheet_id).worksheet(sheet_name)
-        sheet.clear()
-        sheet.update([df.columns.tolist()] + df.values.tolist())
-        logging.info(f"[update_sheet_df] Sheet '{sheet_name}' updated successfully.")
+            cells, deleted_rows, added = diff
+            logging.info(
+                f"[update_sheet_df] '{sheet_name}' diff: {len(cells)} cells, "
+                f"{len(deleted_rows)} deleted rows, {len(added)} added rows"
+            )
+            # 셀 수정 → 행 삭제 순서 (수정은 원래 행 번호 기준이므로 먼저 반영)
+            if cells:
+                sheet.batch_update([
+                    {"range": rowcol_to_a1(row, col), "values": [[value]]}
+                    for row, col, value in cells
+                ])
+            report.applied.add("cells")
+            if deleted_rows:
+                _delete_row_ranges(sheet, deleted_rows)
+            report.applied.add("deleted")
+            if added:
+                sheet.append_rows(added)
+            report.applied.add("added")
+            logging.info(f"[update_sheet_df] Sheet '{sheet_name}' updated successfully.")
+            return report
 
     except Exception as e:
-        logging.error(f"[update_sheet_df] Error updating sheet '{sheet_name}': {e}")
+        _on_sheet_error(e)
+        report.error = str(e)
+        logging.error(f"[update_sheet_df] Error updating sheet '{sheet_name}': {e} (반영된 단계: {sorted(report.applied)})")
+        return report
+
+async def run_in_pool(func, *args, timeout=None):
+    """
+    동기 시트 함수를 시트 전용 스레드 풀(SHEETS_MAX_WORKERS개)에서 실행하고 결과를 기다립니다.
+    봇의 시트 접근은 모두 이 풀을 거치므로 동시에 나가는 시트 요청 수가 제한됩니다.
+    timeout을 넘기거나 호출한 쪽이 취소되면 asyncio.TimeoutError/CancelledError가 전파되고,
+    아직 시작되지 않은 작업은 풀에서 취소됩니다. (이미 실행 중인 요청은 끝까지 돌고 결과만 버림)
+    """
+    loop = asyncio.get_running_loop()
+    # 풀 스레드에서도 호출한 쪽의 테넌트를 그대로 쓰도록 컨텍스트를 복사해서 실행
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(_executor, functools.partial(context.run, func, *args))
+    return await asyncio.wait_for(future, timeout if timeout is not None else SHEETS_TIMEOUT)
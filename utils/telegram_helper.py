@@ -1,15 +1,268 @@
+import contextvars
+import io
+import logging
 import os
-import requests
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from utils.lazy import lazy_import
+from utils.metrics import track, count
+from utils.rate_limit import TokenBucket
+
+# 봇 시작 경로에서 빼기 위해 첫 전송 때 불러옴
+requests = lazy_import("requests")
 
 TELEGRAM_TOKEN = os.environ.get("TELEGRAM_TOKEN")
 ADMIN_CHAT_ID   = os.environ.get("ADMIN_CHAT_ID")
+# 로컬 대역 서버(벤치마크 등)로 돌릴 때만 바꿔 씀
+TELEGRAM_API_BASE = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org")
+
+# 텔레그램 메시지 최대 길이와 채팅방당 전송 속도(초당, 순간 허용량)
+MESSAGE_LIMIT = 4096
+TELEGRAM_RATE_PER_SEC = float(os.environ.get("TELEGRAM_RATE_PER_SEC", "1"))
+TELEGRAM_BURST = int(os.environ.get("TELEGRAM_BURST", "3"))
+TELEGRAM_TIMEOUT = 10
+TELEGRAM_MAX_RETRIES = 3
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT):
+    """limit을 넘는 메시지를 줄 단위로(한 줄이 너무 길면 강제로) 잘라 여러 조각으로"""
+    if len(text) <= limit:
+        return [text]
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+def pack_messages(messages, limit: int = MESSAGE_LIMIT, sep: str = "\n\n"):
+    """여러 메시지를 limit 안에서 최대한 적은 수로 묶음 (메시지 경계 우선)"""
+    packed, current = [], ""
+    for message in messages:
+        for piece in split_message(message, limit):
+            candidate = f"{current}{sep}{piece}" if current else piece
+            if len(candidate) > limit:
+                packed.append(current)
+                current = piece
+            else:
+                current = candidate
+    if current:
+        packed.append(current)
+    return packed
+
+class MultipartUpload:
+    """
+    sendDocument용 multipart/form-data 본문을 파일에서 조금씩 읽어 내보내는 file-like.
+    길이를 미리 알려 주므로 requests가 Content-Length를 붙이고 read()로 나눠 전송합니다.
+    (files= 인자는 파일 전체를 메모리에 올려 본문을 만듦)
+    """
+
+    def __init__(self, fields, field_name, filename, path):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        head = "".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in fields.items()
+        )
+        head += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        )
+        tail = f"\r\n--{boundary}--\r\n".encode()
+        head = head.encode("utf-8")
+        self.len = len(head) + os.path.getsize(path) + len(tail)
+        self._parts = [io.BytesIO(head), open(path, "rb"), io.BytesIO(tail)]
+
+    def __len__(self):
+        return self.len
+
+    def read(self, size=-1):
+        out = b""
+        while self._parts and (size < 0 or len(out) < size):
+            chunk = self._parts[0].read(-1 if size < 0 else size - len(out))
+            if chunk:
+                out += chunk
+            else:
+                self._parts.pop(0).close()
+        return out
+
+    def __iter__(self):
+        # requests는 __iter__가 있는 객체를 스트림 본문으로 취급
+        while True:
+            chunk = self.read(64 * 1024)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        for part in self._parts:
+            part.close()
+        self._parts = []
+
+class TelegramNotifier:
+    """
+    keep-alive 세션을 재사용하는 텔레그램 알림 발송기.
+    - 채팅방별 토큰 버킷으로 전송 속도 제한
+    - 429 응답은 retry_after만큼, 네트워크/5xx 오류는 지수 백오프 후 재시도
+    - 4096자를 넘는 메시지는 자동 분할
+    - coalesce() 안에서 보낸 메시지는 모아 두었다가 최소 개수로 묶어 전송
+      (모으는 목록은 실행 컨텍스트별이라, 다른 스레드/작업의 알림과 섞이지 않음)
+    """
+
+    def __init__(self, token=None, chat_id=None, api_base=None,
+                 rate_per_sec=TELEGRAM_RATE_PER_SEC, burst=TELEGRAM_BURST):
+        self.token = token
+        self.chat_id = chat_id
+        self.api_base = api_base
+        self.rate_per_sec = rate_per_sec
+        self.burst = burst
+        self.session = requests.Session()
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._pending = contextvars.ContextVar(f"telegram_pending_{id(self)}", default=None)
 
-def send_telegram_message(message: str):
+    def _url(self, method):
+        # 모듈 설정값은 호출 시점에 읽음 (벤치마크 등에서 바꿔 끼울 수 있도록)
+        base = self.api_base or TELEGRAM_API_BASE
+        return f"{base}/bot{self.token or TELEGRAM_TOKEN}/{method}"
+
+    def _bucket(self, chat_id):
+        with self._lock:
+            bucket = self._buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._buckets[chat_id] = TokenBucket(self.rate_per_sec, self.burst)
+            return bucket
+
+    def call(self, method, data, files=None, chat_id=None, upload=None):
+        """
+        Bot API 호출 (속도 제한 + 재시도). 성공 시 응답 JSON의 result, 실패 시 None
+        upload=(필드 이름, 파일 이름, 경로)를 주면 그 파일을 디스크에서 스트리밍해 올림
+        """
+        with track(f"telegram.{method}") as t:
+            result = self._call(method, data, files, chat_id, upload)
+            if result is None:
+                t.fail()
+        return result
+
+    def _call(self, method, data, files, chat_id, upload=None):
+        chat_id = chat_id or self.chat_id or ADMIN_CHAT_ID
+        data = dict(data, chat_id=chat_id)
+        for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+            self._bucket(chat_id).acquire()
+            body = None
+            try:
+                if upload is not None:
+                    # 재시도마다 파일을 처음부터 다시 읽도록 본문을 새로 만듦
+                    body = MultipartUpload(data, *upload)
+                    r = self.session.post(
+                        self._url(method), data=body, headers={"Content-Type": body.content_type},
+                        timeout=TELEGRAM_TIMEOUT
+                    )
+                else:
+                    r = self.session.post(self._url(method), data=data, files=files, timeout=TELEGRAM_TIMEOUT)
+            except requests.RequestException as e:
+                wait = 2 ** attempt
+                logging.warning(f"[telegram] {method} 네트워크 오류, {wait}초 후 재시도: {e}")
+            else:
+                if r.status_code == 200:
+                    return r.json().get("result", True)
+                if r.status_code == 429:
+                    try:
+                        wait = r.json()["parameters"]["retry_after"]
+                    except (ValueError, KeyError, TypeError):
+                        wait = 2 ** attempt
+                    logging.warning(f"[telegram] 429 Too Many Requests, {wait}초 대기")
+                    count("telegram.rate_limited")
+                elif r.status_code >= 500:
+                    wait = 2 ** attempt
+                    logging.warning(f"[telegram] {method} status {r.status_code}, {wait}초 후 재시도")
+                else:
+                    logging.error(f"[telegram] {method} 실패: status {r.status_code} {r.text[:200]}")
+                    return None
+            finally:
+                if body is not None:
+                    body.close()
+            if files:
+                # 파일 객체는 이미 읽혔으므로 처음으로 되감아 재전송
+                for f in files.values():
+                    f = f[1] if isinstance(f, tuple) else f
+                    if hasattr(f, "seek"):
+                        f.seek(0)
+            if attempt < TELEGRAM_MAX_RETRIES:
+                count("telegram.retries")
+                time.sleep(wait)
+        logging.error(f"[telegram] {method} 재시도 초과")
+        return None
+
+    def send(self, message: str, chat_id=None) -> bool:
+        pending = self._pending.get()
+        if pending is not None and chat_id is None:
+            pending.append(message)
+            return True
+        ok = True
+        for chunk in split_message(message):
+            ok = self.call("sendMessage", {"text": chunk}, chat_id=chat_id) is not None and ok
+        return ok
+
+    def send_document(self, path, filename=None, caption="", chat_id=None) -> bool:
+        """파일을 문서로 전송 (coalesce와 상관없이 바로 보냄)"""
+        filename = filename or os.path.basename(path)
+        data = {"caption": caption[:1024]} if caption else {}
+        return self.call("sendDocument", data, chat_id=chat_id, upload=("document", filename, path)) is not None
+
+    @contextmanager
+    def coalesce(self):
+        """블록 안의 알림을 모았다가 끝날 때(예외가 나도) 묶어서 전송"""
+        if self._pending.get() is not None:
+            yield self
+            return
+        pending = []
+        token = self._pending.set(pending)
+        try:
+            yield self
+        finally:
+            self._pending.reset(token)
+            for message in pack_messages(pending):
+                self.send(message)
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+def get_notifier() -> TelegramNotifier:
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = TelegramNotifier()
+        return _notifier
+
+def send_telegram_message(message: str) -> bool:
+    try:
+        return get_notifier().send(message)
+    except Exception as e:
+        logging.error(f"텔레그램 전송 오류: {e}")
+        return False
+
+def send_telegram_document(path, filename=None, caption="", chat_id=None) -> bool:
     try:
-        url     = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        payload = {"chat_id": ADMIN_CHAT_ID, "text": message}
-        r = requests.post(url, data=payload)
-        if r.status_code != 200:
-            raise Exception(f"status {r.status_code}")
+        return get_notifier().send_document(path, filename, caption, chat_id)
     except Exception as e:
-        print(f"텔레그램 전송 오류: {e}")
+        logging.error(f"텔레그램 파일 전송 오류: {e}")
+        return False
+
+def coalesce_messages():
+    """with coalesce_messages(): 블록 안의 send_telegram_message를 묶어서 전송"""
+    return get_notifier().coalesce()
@@ -0,0 +1,145 @@
+import contextvars
+import json
+import logging
+import os
+import re
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 테넌트(고객 그룹) 목록 JSON 파일. 없으면 SPREADSHEET_ID 하나만 쓰는 기존 구성
+TENANTS_FILE = os.environ.get("TENANTS_FILE", os.path.join(ROOT, "tenants.json"))
+
+# 기본값 (테넌트 설정에 값이 없을 때)
+DEPOSIT_ACCOUNT = os.environ.get("DEPOSIT_ACCOUNT", "신한은행 110-502-426504")
+KAKAO_LINK = os.environ.get("KAKAO_LINK", "http://pf.kakao.com/_aXeYK/chat")
+# 한 번 실행에서 보낼 수 있는 안내 메일 수 (0이면 제한 없음)
+EMAIL_QUOTA = int(os.environ.get("EMAIL_QUOTA", "0"))
+
+# 테넌트 이름은 로컬 파일 이름과 지표 이름에 들어가므로 영문/숫자/-/_만 허용
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+class Tenant:
+    """
+    스프레드시트 하나를 쓰는 고객 그룹의 설정.
+    name이 빈 문자열이면 기본 테넌트(SPREADSHEET_ID 환경변수, 기존 로컬 파일 경로)입니다.
+    - email_quota: 실행 1회당 안내 메일 최대 발송 수 (0이면 제한 없음)
+    - email_workers / email_rate: 이 테넌트의 메일 발송 동시성/초당 발송 수 상한
+      (계정 전체 한도 EMAIL_WORKERS/EMAIL_RATE_PER_SEC 안에서 적용, None이면 계정 한도만)
+    """
+
+    __slots__ = ("name", "spreadsheet_id", "deposit_account", "kakao_link",
+                 "email_quota", "email_workers", "email_rate")
+
+    def __init__(self, name="", spreadsheet_id=None, deposit_account=None, kakao_link=None,
+                 email_quota=None, email_workers=None, email_rate=None):
+        self.name = name
+        self.spreadsheet_id = spreadsheet_id
+        self.deposit_account = deposit_account or DEPOSIT_ACCOUNT
+        self.kakao_link = kakao_link or KAKAO_LINK
+        self.email_quota = EMAIL_QUOTA if email_quota is None else int(email_quota)
+        self.email_workers = email_workers
+        self.email_rate = email_rate
+
+    @property
+    def label(self):
+        return self.name or "기본"
+
+    def path_for(self, base):
+        """테넌트별 로컬 파일 경로 (기본 테넌트는 base 그대로, 나머지는 foo.sqlite3 → foo.<이름>.sqlite3)"""
+        if not self.name:
+            return base
+        root, ext = os.path.splitext(base)
+        return f"{root}.{self.name}{ext}"
+
+    def __repr__(self):
+        return f"Tenant({self.label!r}, {self.spreadsheet_id!r})"
+
+DEFAULT_TENANT = Tenant()
+
+_current = contextvars.ContextVar("tenant", default=DEFAULT_TENANT)
+
+def current_tenant() -> Tenant:
+    """지금 실행 중인 작업의 테넌트 (use_tenant 밖에서는 기본 테넌트)"""
+    return _current.get()
+
+@contextmanager
+def use_tenant(tenant):
+    """with use_tenant(t): 블록 안의 시트/사본/저널 접근을 테넌트 t로 돌림"""
+    token = _current.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current.reset(token)
+
+# 테넌트 항목 키별 허용 타입 (None이면 기본값 사용)
+_ENTRY_FIELDS = {
+    "name": (str,),
+    "spreadsheet_id": (str,),
+    "deposit_account": (str,),
+    "kakao_link": (str,),
+    "email_quota": (int,),
+    "email_workers": (int,),
+    "email_rate": (int, float),
+}
+
+def _check_entry(path, index, entry):
+    """테넌트 항목 하나의 형식 검사. 잘못되었으면 ValueError"""
+    where = f"{path}: {index + 1}번째 테넌트"
+    if not isinstance(entry, dict):
+        raise ValueError(f"{where}가 객체(JSON object)가 아닙니다: {entry!r}")
+    unknown = sorted(set(entry) - set(_ENTRY_FIELDS))
+    if unknown:
+        raise ValueError(f"{where}에 알 수 없는 키가 있습니다: {', '.join(unknown)}")
+    for key in ("name", "spreadsheet_id"):
+        if key not in entry:
+            raise ValueError(f"{where}에 {key}가 없습니다.")
+    for key, types in _ENTRY_FIELDS.items():
+        value = entry.get(key)
+        # bool은 int의 하위 타입이라 따로 거름
+        if value is not None and (isinstance(value, bool) or not isinstance(value, types)):
+            raise ValueError(f"{where}의 {key} 형식이 잘못되었습니다: {value!r}")
+    if entry.get("email_quota") is not None and entry["email_quota"] < 0:
+        raise ValueError(f"{where}의 email_quota는 0 이상이어야 합니다: {entry['email_quota']}")
+    for key in ("email_workers", "email_rate"):
+        if entry.get(key) is not None and entry[key] <= 0:
+            raise ValueError(f"{where}의 {key}는 0보다 커야 합니다: {entry[key]}")
+
+def load_tenants(path=None):
+    """
+    테넌트 목록을 읽습니다. 파일이 없으면 [기본 테넌트].
+    파일 형식: [{"name": "groupA", "spreadsheet_id": "...", "deposit_account": "...",
+               "kakao_link": "...", "email_quota": 200}, ...]
+    설정이 잘못되었으면 ValueError (잘못된 시트에 쓰지 않도록 실행 전에 중단)
+    """
+    path = path or TENANTS_FILE
+    if not os.path.exists(path):
+        return [DEFAULT_TENANT]
+
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path}: 테넌트 목록(JSON 배열)이 비어 있거나 형식이 다릅니다.")
+
+    tenants = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        _check_entry(path, index, entry)
+        name = entry["name"]
+        if not _NAME_RE.match(name):
+            raise ValueError(f"{path}: 테넌트 이름은 영문/숫자/-/_만 쓸 수 있습니다: {name!r}")
+        if name in seen:
+            raise ValueError(f"{path}: 테넌트 이름 중복: {name}")
+        if not entry.get("spreadsheet_id"):
+            raise ValueError(f"{path}: '{name}'에 spreadsheet_id가 없습니다.")
+        seen.add(name)
+        tenants.append(Tenant(
+            name=name,
+            spreadsheet_id=entry["spreadsheet_id"],
+            deposit_account=entry.get("deposit_account"),
+            kakao_link=entry.get("kakao_link"),
+            email_quota=entry.get("email_quota"),
+            email_workers=entry.get("email_workers"),
+            email_rate=entry.get("email_rate"),
+        ))
+    logging.info(f"[load_tenants] {len(tenants)}개 테넌트: {', '.join(t.name for t in tenants)}")
+    return tenants
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+import time
+
+from utils.group_index import get_occupancy
+from utils.metrics import count
+from utils.replica import async_read_records
+from utils.user_index import ExpiryIndex
+from utils.user_store import UserStore
+
+# 스냅샷 유효시간(초). 0이면 매번 새로 읽음
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "300"))
+
+# user_data 시트의 메모리 스냅샷 (봇 명령어 공용) — UserRecord 목록과 이메일/만료일 인덱스
+_users = None
+_store = None
+_index = None
+_loaded_at = 0.0
+_refresh_lock = asyncio.Lock()
+
+async def _load_users(force_sync=False):
+    # 로컬 사본에서 읽고, 사본이 오래되었거나 force_sync면 시트와 먼저 동기화
+    logging.info("🧾 [user_cache] 사용자 데이터 로딩 중...")
+    users = await async_read_records("user_data", max_age=0 if force_sync else None)
+    logging.info(f"✅ [user_cache] 총 {len(users)}명 로드됨.")
+    return users
+
+def _is_fresh():
+    return _users is not None and time.monotonic() - _loaded_at < USER_CACHE_TTL
+
+async def get_users(force_refresh=False):
+    """
+    캐시된 사용자 목록을 반환합니다.
+    TTL이 지났거나 force_refresh면 시트를 다시 읽되,
+    동시에 들어온 요청들은 하나의 조회 결과를 함께 기다립니다.
+    """
+    global _users, _store, _index, _loaded_at
+    if not force_refresh and _is_fresh():
+        count("user_cache.hit")
+        return _users
+    count("user_cache.miss")
+
+    requested_at = time.monotonic()
+    async with _refresh_lock:
+        # 기다리는 동안 다른 요청이 이미 새로 읽어 왔으면 그대로 사용
+        if _users is not None and _loaded_at >= requested_at:
+            return _users
+        if not force_refresh and _is_fresh():
+            return _users
+
+        try:
+            users = await _load_users(force_refresh)
+        except asyncio.TimeoutError:
+            if _users is None:
+                raise
+            logging.warning("⚠️ [user_cache] 시트 응답 시간 초과 — 기존 스냅샷 사용")
+            return _users
+        if not users and _users:
+            # 조회 실패(빈 결과)로 기존 스냅샷을 덮어쓰지 않음
+            logging.warning("⚠️ [user_cache] 빈 결과 수신 — 기존 스냅샷 유지")
+            return _users
+
+        _store = UserStore.from_records(users)
+        _users = _store.records
+        _index = ExpiryIndex(_users)
+        # 그룹 인원 인덱스는 다시 만들지 않고 바뀐 사용자만 반영
+        get_occupancy().sync(_users)
+        _loaded_at = time.monotonic()
+        return _users
+
+async def get_expiry_index(force_refresh=False):
+    """현재 스냅샷에 대한 만료일 인덱스 (스냅샷과 함께 한 번만 생성)"""
+    await get_users(force_refresh)
+    return _index
+
+async def get_user_store(force_refresh=False):
+    """현재 스냅샷의 이메일 키 저장소 (UserStore)"""
+    await get_users(force_refresh)
+    return _store
+
+async def get_group_occupancy(force_refresh=False):
+    """현재 스냅샷 기준 그룹 인원 인덱스 (GroupOccupancy)"""
+    await get_users(force_refresh)
+    return get_occupancy()
+
+def invalidate_users():
+    """다음 조회 때 시트를 다시 읽도록 스냅샷을 무효화"""
+    global _loaded_at
+    _loaded_at = 0.0
+
+def snapshot_age():
+    """현재 스냅샷이 만들어진 뒤 지난 시간(초). 스냅샷이 없으면 None"""
+    if _users is None:
+        return None
+    return time.monotonic() - _loaded_at
@@ -0,0 +1,72 @@
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+
+DATE_FORMAT = "%Y-%m-%d"
+
+def parse_date(raw):
+    """만료일 값을 date로 변환. 비어 있거나 형식이 틀리면 None"""
+    if isinstance(raw, datetime):
+        return raw.date()
+    if isinstance(raw, date):
+        return raw
+    raw = str(raw or "").strip()
+    if not raw:
+        return None
+    try:
+        return datetime.strptime(raw, DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+class ExpiryIndex:
+    """
+    사용자 목록을 만료일 순으로 정렬해 둔 인덱스.
+    만료일 파싱은 생성 시 한 번만 하고, 기간 조회는 bisect로 O(log n + k)
+    """
+
+    def __init__(self, users):
+        self.users = list(users)
+        entries = []
+        invalid = 0
+        for pos, user in enumerate(self.users):
+            exp = parse_date(user.get("만료일", ""))
+            if exp is None:
+                if str(user.get("만료일", "") or "").strip():
+                    invalid += 1
+                continue
+            entries.append((exp, pos))
+        entries.sort()
+
+        self._dates = [exp for exp, _ in entries]
+        self._positions = [pos for _, pos in entries]
+        self.invalid_count = invalid
+        if invalid:
+            logging.warning(f"⚠️ [ExpiryIndex] 만료일 파싱 실패 {invalid}건 제외")
+
+    def __len__(self):
+        return len(self._dates)
+
+    def between(self, start, end):
+        """start <= 만료일 <= end 인 (만료일, 사용자) 목록 (만료일 오름차순)"""
+        lo = bisect_left(self._dates, start) if start is not None else 0
+        hi = bisect_right(self._dates, end) if end is not None else len(self._dates)
+        return [(self._dates[k], self.users[self._positions[k]]) for k in range(lo, hi)]
+
+    def on(self, day):
+        """만료일이 day인 사용자 목록"""
+        return [user for _, user in self.between(day, day)]
+
+    def until(self, day):
+        """만료일이 day 이하(이미 만료 포함)인 (만료일, 사용자) 목록"""
+        return self.between(None, day)
+
+    def within_days(self, today, n):
+        """
+        .만료 N 조회 규칙
+        N > 0: 오늘 이후 N일 이내, N < 0: 오늘 이전 |N|일 이내, N == 0: 오늘
+        """
+        if n > 0:
+            return self.between(today + timedelta(days=1), today + timedelta(days=n))
+        if n < 0:
+            return self.between(today + timedelta(days=n), today - timedelta(days=1))
+        return self.between(today, today)
@@ -0,0 +1,158 @@
+from utils.lazy import lazy_import
+
+sheet_helper = lazy_import("utils.sheet_helper")
+
+# 시트 열 이름 → UserRecord 속성 이름
+COLUMN_ATTRS = {
+    "이름": "name",
+    "이메일": "email",
+    "만료일": "expire",
+    "전화번호": "phone",
+    "비고": "remark",
+    "그룹": "group",
+    "그룹 번호": "group_no",
+    "결제 여부": "paid",
+    "지인 여부": "friend",
+}
+
+def normalize_email(email) -> str:
+    """비교용 이메일 키 (앞뒤 공백 제거 + 소문자)"""
+    return str(email or "").strip().lower()
+
+def format_phone(num: str) -> str:
+    """숫자만 골라 11자리면 xxx-xxxx-xxxx, 10자리면 xx-xxxx-xxxx"""
+    digits = "".join(filter(str.isdigit, num))
+    if len(digits) == 11:
+        return f"{digits[:3]}-{digits[3:7]}-{digits[7:]}"
+    if len(digits) == 10:
+        return f"{digits[:2]}-{digits[2:6]}-{digits[6:]}"
+    return num
+
+class UserRecord:
+    """
+    사용자 한 명(시트 한 행). dict 대신 __slots__로 메모리를 줄이고,
+    get("열 이름")으로 기존 dict 기반 코드와도 그대로 호환됩니다.
+    row는 원래 DataFrame의 행 라벨(또는 목록에서의 위치)입니다.
+    """
+
+    __slots__ = ("row", "extra", *COLUMN_ATTRS.values())
+
+    def __init__(self, row, values):
+        self.row = row
+        extra = None
+        for column, value in values.items():
+            attr = COLUMN_ATTRS.get(column)
+            if attr is None:
+                if extra is None:
+                    extra = {}
+                extra[column] = value
+            else:
+                setattr(self, attr, value)
+        self.extra = extra
+        for attr in COLUMN_ATTRS.values():
+            if not hasattr(self, attr):
+                setattr(self, attr, "")
+
+    def get(self, column, default=None):
+        attr = COLUMN_ATTRS.get(column)
+        if attr is not None:
+            return getattr(self, attr)
+        if self.extra is not None:
+            return self.extra.get(column, default)
+        return default
+
+    def __getitem__(self, column):
+        value = self.get(column, KeyError)
+        if value is KeyError:
+            raise KeyError(column)
+        return value
+
+    def to_dict(self):
+        values = {column: getattr(self, attr) for column, attr in COLUMN_ATTRS.items()}
+        if self.extra:
+            values.update(self.extra)
+        return values
+
+    def __repr__(self):
+        return f"UserRecord({self.name!r}, {self.email!r}, {self.expire!r})"
+
+class UserStore:
+    """
+    정규화한 이메일로 사용자 행을 O(1)에 찾는 메모리 저장소.
+    - 같은 이메일이 여러 행이면 get()은 첫 행, all()은 전부
+    - update()/delete()는 바로 DataFrame을 건드리지 않고 모아 두었다가 apply()에서 한 번에 반영
+    """
+
+    def __init__(self, records):
+        self.records = list(records)
+        self._by_email = {}
+        for record in self.records:
+            self._by_email.setdefault(normalize_email(record.email), []).append(record)
+        self._updates = {}
+        self._deleted = set()
+
+    @classmethod
+    def from_frame(cls, df):
+        """get_sheet_df로 읽은 DataFrame에서 생성 (record.row = 행 라벨)"""
+        if df.empty:
+            return cls([])
+        return cls(UserRecord(label, values) for label, values in zip(df.index, sheet_helper.frame_records(df)))
+
+    @classmethod
+    def from_records(cls, rows):
+        """get_all_records 모양의 dict 목록에서 생성 (record.row = 목록 위치)"""
+        return cls(UserRecord(pos, values) for pos, values in enumerate(rows))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, email):
+        key = normalize_email(email)
+        return key in self._by_email and key not in self._deleted
+
+    def get(self, email):
+        """이메일의 첫 행 (없거나 삭제 예정이면 None)"""
+        key = normalize_email(email)
+        if key in self._deleted:
+            return None
+        records = self._by_email.get(key)
+        return records[0] if records else None
+
+    def all(self, email):
+        key = normalize_email(email)
+        if key in self._deleted:
+            return []
+        return list(self._by_email.get(key, ()))
+
+    def update(self, email, column, value):
+        """이메일 첫 행의 열 값을 바꾸고 apply() 때 반영할 변경으로 기록. 대상이 없으면 False"""
+        record = self.get(email)
+        if record is None:
+            return False
+        attr = COLUMN_ATTRS.get(column)
+        if attr is not None:
+            setattr(record, attr, value)
+        else:
+            record.extra = dict(record.extra or {}, **{column: value})
+        self._updates.setdefault(record.row, {})[column] = value
+        return True
+
+    def delete(self, email):
+        """이메일의 모든 행을 삭제 예정으로 표시. 대상이 없으면 False"""
+        if email not in self:
+            return False
+        self._deleted.add(normalize_email(email))
+        return True
+
+    def apply(self, df):
+        """
+        모아 둔 변경/삭제를 DataFrame에 한 번에 반영한 결과를 반환합니다.
+        (행 라벨은 그대로 두므로 diff_sheet_df로 원본과 비교할 수 있음)
+        """
+        for row, changes in self._updates.items():
+            for column, value in changes.items():
+                df.at[row, column] = value
+        if self._deleted and "이메일" in df.columns:
+            keys = df["이메일"].fillna("").astype(str).str.strip().str.lower()
+            df = df[~keys.isin(self._deleted)]
+        return df